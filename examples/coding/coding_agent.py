@@ -1,8 +1,10 @@
 """Example of a deep coding agent built on top of deepagents."""
 
 import asyncio
+import copy
+import functools
 from typing import List, Dict, Any
-from deepagents import create_deep_agent, SubAgent
+from deepagents import create_deep_agent, run_batch_async, SubAgent
 from deepagents.filesystem import mkdir, cd, pwd, ls_enhanced, file_history, cp, human_input
 from langchain_core.tools import tool
 from dotenv import load_dotenv
@@ -11,9 +13,9 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Custom coding tools
-@tool
-def analyze_code(file_path: str) -> Dict[str, Any]:
-    """Analyze code quality and provide suggestions."""
+# The mock implementations are pure, so they are memoized
+@functools.lru_cache(maxsize=512)
+def _analyze_code(file_path: str) -> Dict[str, Any]:
     # This is a mock implementation
     return {
         "file": file_path,
@@ -26,15 +28,13 @@ def analyze_code(file_path: str) -> Dict[str, Any]:
     }
 
 
-@tool
-def refactor_code(file_path: str, refactor_type: str) -> str:
-    """Refactor code based on specified type (e.g., 'extract_method', 'rename_variable')."""
+@functools.lru_cache(maxsize=512)
+def _refactor_code(file_path: str, refactor_type: str) -> str:
     return f"Refactored {file_path} with {refactor_type} refactoring"
 
 
-@tool
-def generate_tests(file_path: str, test_framework: str = "pytest") -> str:
-    """Generate unit tests for the given file."""
+@functools.lru_cache(maxsize=512)
+def _generate_tests(file_path: str, test_framework: str) -> str:
     return f"""import pytest
 from {file_path.replace('.py', '')} import *
 
@@ -45,6 +45,24 @@ class Test{file_path.replace('.py', '').title()}:
 """
 
 
+@tool
+def analyze_code(file_path: str) -> Dict[str, Any]:
+    """Analyze code quality and provide suggestions."""
+    return copy.deepcopy(_analyze_code(file_path))
+
+
+@tool
+def refactor_code(file_path: str, refactor_type: str) -> str:
+    """Refactor code based on specified type (e.g., 'extract_method', 'rename_variable')."""
+    return _refactor_code(file_path, refactor_type)
+
+
+@tool
+def generate_tests(file_path: str, test_framework: str = "pytest") -> str:
+    """Generate unit tests for the given file."""
+    return _generate_tests(file_path, test_framework)
+
+
 @tool
 def run_tests(test_path: str = "tests/") -> Dict[str, Any]:
     """Run tests and return results."""
@@ -57,13 +75,17 @@ def run_tests(test_path: str = "tests/") -> Dict[str, Any]:
 
 
 # Human-in-the-loop callback
-def coding_human_callback(event: str, message: str):
+async def coding_human_callback(event: str, message: str):
     """Handle human-in-the-loop interactions."""
     print(f"\n🤖 Agent Event: {event}")
     print(f"📝 Message: {message}")
     
     if event == "Task started" and "refactor" in message.lower():
-        response = input("Would you like to review the refactoring plan? (y/n): ")
+        # Read the answer in a worker thread so parallel subagents keep running
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(
+            None, input, "Would you like to review the refactoring plan? (y/n): "
+        )
         if response.lower() == 'y':
             print("Proceeding with human review...")
             # In a real implementation, this would trigger a review process
@@ -261,20 +283,18 @@ async def benchmark_coding_agent():
         "Refactor database connection handling"
     ]
     
+    # Independent tasks are dispatched concurrently
+    start_time = time.time()
+    outputs = await run_batch_async(
+        agent,
+        [{"messages": [{"role": "user", "content": task}]} for task in tasks],
+    )
+    total_time = time.time() - start_time
+
     results = []
-    for task in tasks:
-        start_time = time.time()
-        
-        result = await agent.ainvoke({
-            "messages": [{"role": "user", "content": task}]
-        })
-        
-        end_time = time.time()
-        execution_time = end_time - start_time
-        
+    for task, result in zip(tasks, outputs):
         results.append({
             "task": task,
-            "execution_time": execution_time,
             "messages_count": len(result.get("messages", [])),
             "files_created": len(result.get("files", {}))
         })
@@ -284,13 +304,11 @@ async def benchmark_coding_agent():
     print("-" * 50)
     for res in results:
         print(f"Task: {res['task']}")
-        print(f"  Time: {res['execution_time']:.2f}s")
         print(f"  Messages: {res['messages_count']}")
         print(f"  Files: {res['files_created']}")
         print()
     
-    avg_time = sum(r['execution_time'] for r in results) / len(results)
-    print(f"Average execution time: {avg_time:.2f}s")
+    print(f"Total wall time: {total_time:.2f}s for {len(tasks)} tasks")
 
 
 if __name__ == "__main__":
@@ -1,3 +1,3 @@
-from deepagents.graph import create_deep_agent
+from deepagents.graph import create_deep_agent, run_batch_async
 from deepagents.state import DeepAgentState
 from deepagents.sub_agent import SubAgent
@@ -0,0 +1,127 @@
+"""Hot-path file reducer, kept free of dynamic Python so mypyc can compile it.
+
+`deepagents.state` re-exports everything here. To build the native extension
+in place, run `mypyc src/deepagents/_state_fast.py`; Python then imports the
+compiled module instead of this file, with no API change. The test suite
+runs mypy over this module to keep it compilable.
+"""
+
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Final, List, Optional
+import difflib
+import sys
+
+# Interned so every file shares one permissions object, and values parsed
+# from model output or checkpoints can be interned onto the same strings
+_DEFAULT_PERMS: Final = sys.intern("rw-r--r--")
+_HISTORY_LIMIT: Final = 10
+
+
+def _intern_file(file_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Intern the permissions string of an incoming file entry in place."""
+    metadata = file_data.get("metadata")
+    if isinstance(metadata, dict) and "permissions" in metadata:
+        metadata["permissions"] = sys.intern(metadata["permissions"])
+    return file_data
+
+
+def _delta(new: str, old: str) -> List[List[Any]]:
+    """Line edits that turn `new` back into `old`.
+
+    Each edit is `[start, end, lines]`: replace `new` lines `start:end` with
+    `lines`. Unchanged lines are not stored.
+    """
+    new_lines = new.splitlines(keepends=True)
+    old_lines = old.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, new_lines, old_lines, autojunk=False)
+    return [
+        [i1, i2, old_lines[j1:j2]]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def _string_to_vfile(content: str, now: str) -> Dict[str, Any]:
+    """Convert simple string content to a new VirtualFile."""
+    return {
+        "content": content,
+        "metadata": {
+            "created_at": now,
+            "modified_at": now,
+            "size": len(content),
+            "permissions": _DEFAULT_PERMS,
+            "version": 1,
+        },
+    }
+
+
+def _merge_vfile(previous: Any, file_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Update an existing file with a version increment.
+
+    `file_data` is the incoming entry and is updated in place; `previous` is
+    only read.
+    """
+    _intern_file(file_data)
+    content = file_data["content"]
+    if isinstance(previous, dict) and previous.get("content", "") != content:
+        # Fetch each nested metadata dict and value once
+        metadata = file_data["metadata"]
+        previous_metadata = previous["metadata"]
+        previous_version = previous_metadata["version"]
+        old_content = previous.get("content", "")
+        # Add to history as a delta against the new content. Bounded copy:
+        # the previous history stays as it was, and the append evicts the
+        # oldest version once full. Also restores maxlen on histories loaded
+        # as lists.
+        history = deque(previous.get("history", ()), maxlen=_HISTORY_LIMIT)
+        history.append(
+            {
+                "delta": _delta(content, old_content),
+                "size": len(old_content),
+                "modified_at": previous_metadata["modified_at"],
+                "version": previous_version,
+            }
+        )
+        file_data["history"] = history
+        metadata["version"] = previous_version + 1
+    return file_data
+
+
+def file_reducer(
+    left: Optional[Dict[str, Any]], right: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Enhanced file reducer that handles virtual filesystem."""
+    if left is None:
+        return right or {}
+    elif right is None:
+        return left
+    else:
+        if not right or right is left:
+            # No-op update: keep the current dict without copying it
+            return left
+        # Convert the update on its own, reading previous versions from left.
+        # left is never mutated: LangGraph hands the same dict to checkpoints
+        # and stream consumers, so it is merged into a new dict at the end.
+        if all(type(file_data) is str for file_data in right.values()):
+            # Bulk write of plain contents: convert in one comprehension
+            created = datetime.now().isoformat()
+            return {
+                **left,
+                **{path: _string_to_vfile(c, created) for path, c in right.items()},
+            }
+        updates = {}
+        now: Optional[str] = None  # One timestamp per reduce, taken only if a file is created
+        for path, file_data in right.items():
+            # Exact type checks: state values are plain str/dict
+            kind = type(file_data)
+            if kind is str:
+                if now is None:
+                    now = datetime.now().isoformat()
+                updates[path] = _string_to_vfile(file_data, now)
+            elif kind is dict and "content" in file_data:
+                updates[path] = _merge_vfile(left.get(path), file_data)
+            else:
+                updates[path] = file_data
+        # Single merge of the converted entries over left
+        return {**left, **updates}
@@ -0,0 +1,234 @@
+"""LLMCompiler-style planner/scheduler loop for deep agents.
+
+Instead of asking the model for one tool call at a time, the planner asks for
+the whole set of tool calls up front as a DAG. The scheduler then dispatches
+every step whose dependencies are satisfied in a single wave, so independent
+steps (e.g. delegating disjoint files to different subagents) run concurrently
+and wall time follows the critical path of the plan rather than its length.
+"""
+
+import json
+import re
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Type, Union
+
+from langchain_core.language_models import LanguageModelLike
+from langchain_core.messages import AIMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+from langchain_core.tools import BaseTool, tool
+from langgraph.graph import END, START, StateGraph
+from langgraph.prebuilt import ToolNode
+
+from deepagents.prompts import COMPILER_PLANNER_PROMPT
+from deepagents.state import DeepAgentState
+
+_REFERENCE_RE = re.compile(r"\$\{(\w+)\}")
+
+
+def _message_text(content: Union[str, List[Any]]) -> str:
+    """Extract the text of a message whose content may be a list of blocks."""
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block if isinstance(block, str) else block.get("text", "")
+        for block in content
+        if isinstance(block, str) or block.get("type") == "text"
+    )
+
+
+def _parse_plan(text: str) -> List[Dict[str, Any]]:
+    """Parse the planner output into a list of normalized steps.
+
+    Malformed output yields an empty plan, in which case the joiner answers
+    directly (and may still call tools itself).
+    """
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        return []
+    try:
+        steps = json.loads(text[start : end + 1]).get("steps") or []
+    except (json.JSONDecodeError, AttributeError):
+        return []
+    if not isinstance(steps, list):
+        return []
+
+    plan = []
+    for index, step in enumerate(steps):
+        if not isinstance(step, dict) or "tool" not in step:
+            continue
+        plan.append(
+            {
+                "id": str(step.get("id", index + 1)),
+                "tool": step["tool"],
+                "args": step.get("args") or {},
+                "depends_on": [str(dep) for dep in step.get("depends_on") or []],
+                # Provider-safe tool call id, unique across planning rounds
+                "call_id": f"call_{uuid.uuid4().hex}",
+            }
+        )
+    return plan
+
+
+def _resolve_args(value: Any, results: Dict[str, Any]) -> Any:
+    """Substitute `${id}` references with the output of earlier steps."""
+    if isinstance(value, str):
+        match = _REFERENCE_RE.fullmatch(value)
+        if match and match.group(1) in results:
+            return results[match.group(1)]
+        return _REFERENCE_RE.sub(
+            lambda m: str(results.get(m.group(1), m.group(0))), value
+        )
+    if isinstance(value, dict):
+        return {k: _resolve_args(v, results) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_resolve_args(v, results) for v in value]
+    return value
+
+
+def create_compiler_agent(
+    model: LanguageModelLike,
+    prompt: str,
+    tools: Sequence[Union[BaseTool, Any]],
+    state_schema: Optional[Type[DeepAgentState]] = None,
+):
+    """Create a planner/scheduler/joiner graph over the given tools.
+
+    The graph has three nodes:
+        - `planner`: asks the model for a JSON DAG of tool calls.
+        - `scheduler`: records finished step outputs in `step_results` and
+          emits every step whose dependencies are met as one parallel batch.
+          Batches are executed by a `ToolNode`, which awaits the calls together
+          with `asyncio.gather`.
+        - `joiner`: writes the final answer from the collected results. If it
+          still needs tools, its calls go through the same `ToolNode`.
+
+    Args:
+        model: The chat model used for planning and answering.
+        prompt: The system prompt of the agent.
+        tools: The tools available to the plan, including the `task` tool.
+        state_schema: The state schema. Should subclass from DeepAgentState.
+
+    Returns:
+        CompiledStateGraph: The compiled agent graph.
+    """
+    if isinstance(model, str):
+        from langchain.chat_models import init_chat_model
+
+        model = init_chat_model(model)
+
+    # Provider-side tools (plain dicts) cannot be executed locally
+    tools = [
+        t if isinstance(t, BaseTool) else tool(t)
+        for t in tools
+        if not isinstance(t, dict)
+    ]
+    tool_node = ToolNode(tools)
+    joiner_model = model.bind_tools(tools)
+
+    tool_lines = []
+    for tool_ in tools:
+        args = tool_.tool_call_schema.model_json_schema().get("properties", {})
+        tool_lines.append(
+            f"- {tool_.name}: {tool_.description}\n  args: {json.dumps(args)}"
+        )
+    planner_prompt = (
+        prompt + "\n\n" + COMPILER_PLANNER_PROMPT.format(tools="\n".join(tool_lines))
+    )
+
+    def _planner_update(response) -> Dict[str, Any]:
+        plan = _parse_plan(_message_text(response.content))
+        return {"plan": plan, "step_results": {}}
+
+    def planner(state: DeepAgentState) -> Dict[str, Any]:
+        messages = [SystemMessage(planner_prompt), *state["messages"]]
+        return _planner_update(model.invoke(messages))
+
+    async def aplanner(state: DeepAgentState) -> Dict[str, Any]:
+        messages = [SystemMessage(planner_prompt), *state["messages"]]
+        return _planner_update(await model.ainvoke(messages))
+
+    def scheduler(state: DeepAgentState) -> Dict[str, Any]:
+        plan = state.get("plan", [])
+        results = dict(state.get("step_results", {}))
+        step_by_call = {step["call_id"]: step["id"] for step in plan}
+
+        # Collect the outputs of the batch that just ran
+        for message in reversed(state["messages"]):
+            if not isinstance(message, ToolMessage):
+                break
+            if message.tool_call_id in step_by_call:
+                results[step_by_call[message.tool_call_id]] = message.content
+
+        pending = [step for step in plan if step["id"] not in results]
+        ready = [
+            step
+            for step in pending
+            if all(dep in results for dep in step["depends_on"])
+        ]
+        if pending and not ready:
+            # Cyclic or dangling dependencies: report them instead of stalling
+            for step in pending:
+                results[step["id"]] = (
+                    f"Error: step {step['id']} has unresolved dependencies "
+                    f"{step['depends_on']}"
+                )
+            return {"step_results": results}
+        if not ready:
+            return {"step_results": results}
+
+        tool_calls = [
+            {
+                "name": step["tool"],
+                "args": _resolve_args(step["args"], results),
+                "id": step["call_id"],
+                "type": "tool_call",
+            }
+            for step in ready
+        ]
+        return {
+            "step_results": results,
+            "messages": [AIMessage(content="", tool_calls=tool_calls)],
+        }
+
+    def _finalize(state: DeepAgentState, response: AIMessage) -> Dict[str, Any]:
+        # Same guard as create_react_agent when the recursion limit is near.
+        # Joiner tool calls take three more steps (tools, scheduler, joiner),
+        # and LangGraph stops before running a step at remaining_steps 0.
+        if response.tool_calls and state.get("remaining_steps", 4) < 4:
+            return {
+                "messages": [
+                    AIMessage(
+                        id=response.id,
+                        content="Sorry, need more steps to process this request.",
+                    )
+                ]
+            }
+        return {"messages": [response]}
+
+    def joiner(state: DeepAgentState) -> Dict[str, Any]:
+        messages = [SystemMessage(prompt), *state["messages"]]
+        return _finalize(state, joiner_model.invoke(messages))
+
+    async def ajoiner(state: DeepAgentState) -> Dict[str, Any]:
+        messages = [SystemMessage(prompt), *state["messages"]]
+        return _finalize(state, await joiner_model.ainvoke(messages))
+
+    def route_scheduler(state: DeepAgentState) -> str:
+        last = state["messages"][-1]
+        return "tools" if isinstance(last, AIMessage) and last.tool_calls else "joiner"
+
+    def route_joiner(state: DeepAgentState) -> str:
+        last = state["messages"][-1]
+        return "tools" if isinstance(last, AIMessage) and last.tool_calls else END
+
+    builder = StateGraph(state_schema or DeepAgentState)
+    builder.add_node("planner", RunnableLambda(planner, afunc=aplanner))
+    builder.add_node("scheduler", scheduler)
+    builder.add_node("tools", tool_node)
+    builder.add_node("joiner", RunnableLambda(joiner, afunc=ajoiner))
+    builder.add_edge(START, "planner")
+    builder.add_edge("planner", "scheduler")
+    builder.add_conditional_edges("scheduler", route_scheduler, ["tools", "joiner"])
+    builder.add_edge("tools", "scheduler")
+    builder.add_conditional_edges("joiner", route_joiner, ["tools", END])
+    return builder.compile()
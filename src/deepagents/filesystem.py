@@ -1,14 +1,121 @@
 """Enhanced virtual filesystem tools for deep agents."""
 
 from typing import Dict, List, Optional, Annotated
-from langchain_core.tools import tool
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import StructuredTool, tool
 from langgraph.prebuilt import InjectedState
 from langgraph.types import Command
 from langchain_core.messages import ToolMessage
 from langchain_core.tools import InjectedToolCallId
-from deepagents.state import DeepAgentState, VirtualFile, FileMetadata
+from deepagents.state import (
+    _DEFAULT_PERMS,
+    DeepAgentState,
+    VirtualFile,
+    FileMetadata,
+)
 from datetime import datetime
+import asyncio
+import bisect
+import hashlib
+import itertools
 import os
+import time
+from types import MappingProxyType
+
+# Default for read-only tools when the state has no virtual filesystem yet
+_EMPTY_VFS = MappingProxyType(
+    {"files": MappingProxyType({}), "directories": (), "current_directory": "/"}
+)
+
+# ls_enhanced row formats, bound once instead of re-parsed per entry
+_FILE_FMT = "- {}  {:8d}  {}".format
+_DIR_FMT = "d rwxr-xr-x  {}/".format
+
+# Futures of human_input calls awaiting a response, keyed by tool call id
+_PENDING_HUMAN: Dict[str, asyncio.Future] = {}
+
+
+def _store_blob(vfs: Dict, content: str) -> str:
+    """Store content once in the blob table and return its SHA256 key."""
+    digest = hashlib.sha256(content.encode()).hexdigest()
+    vfs.setdefault("blobs", {}).setdefault(digest, content)
+    return digest
+
+
+def _file_content(vfs: Dict, file_data) -> str:
+    """Resolve the content of a file or history entry, following blob refs."""
+    if not isinstance(file_data, dict):
+        return file_data
+    if "content_ref" in file_data:
+        return vfs.get("blobs", {}).get(file_data["content_ref"], "")
+    return file_data.get("content", "")
+
+
+def _new_vfs() -> Dict:
+    """A fresh empty virtual filesystem for tools that write to it."""
+    return {"files": {}, "directories": [], "current_directory": "/"}
+
+
+def _timestamp(metadata: Dict, field: str) -> str:
+    """Format `<field>_ns` for display, falling back to a stored ISO string."""
+    ns = metadata.get(f"{field}_ns")
+    if ns is None:
+        return metadata.get(field, "")
+    return datetime.fromtimestamp(ns / 1e9).isoformat()
+
+
+def _children_index(vfs: Dict) -> Dict[str, List[str]]:
+    """Return the parent -> sorted children index, building it for older states."""
+    children = vfs.get("children")
+    if children is None:
+        children = {}
+        # Group by parent, then sort each sibling list once
+        entries = itertools.chain(vfs.get("directories", []), vfs.get("files", {}))
+        for entry in dict.fromkeys(entries):
+            if entry != "/":
+                children.setdefault(os.path.dirname(entry), []).append(entry)
+        for siblings in children.values():
+            siblings.sort()
+        vfs["children"] = children
+    return children
+
+
+def _add_child(vfs: Dict, path: str) -> str:
+    """Register a path under its parent in the children index; return the parent."""
+    parent = os.path.dirname(path)
+    siblings = _children_index(vfs).setdefault(parent, [])
+    i = bisect.bisect_left(siblings, path)
+    if i == len(siblings) or siblings[i] != path:
+        siblings.insert(i, path)
+    return parent
+
+
+def _children_patch(vfs: Dict, added, indexed: bool) -> Dict[str, List[str]]:
+    """Index entries to return in an update.
+
+    Only the added paths are sent, grouped by parent, so virtual_fs_reducer
+    can union them with what parallel calls added in the same step. A state
+    that had no index gets the whole index built here persisted instead.
+    """
+    if not indexed:
+        return _children_index(vfs)
+    patch: Dict[str, List[str]] = {}
+    for path in added:
+        patch.setdefault(os.path.dirname(path), []).append(path)
+    return patch
+
+
+def _dir_exists(vfs: Dict, path: str) -> bool:
+    """Check for a directory via the children index of its parent."""
+    if path == "/":
+        return True
+    siblings = _children_index(vfs).get(os.path.dirname(path), ())
+    i = bisect.bisect_left(siblings, path)
+    return (
+        i < len(siblings)
+        and siblings[i] == path
+        and path not in vfs.get("files", {})
+    )
 
 
 @tool
@@ -18,15 +125,15 @@ def mkdir(
     tool_call_id: Annotated[str, InjectedToolCallId],
 ) -> Command:
     """Create a directory in the virtual filesystem."""
-    vfs = state.get(
-        "virtual_fs", {"files": {}, "directories": [], "current_directory": "/"}
-    )
+    vfs = state.get("virtual_fs") or _new_vfs()
+    indexed = "children" in vfs
 
     # Normalize path
     if not path.startswith("/"):
         path = os.path.join(vfs["current_directory"], path)
+    path = os.path.normpath(path)
 
-    if path in vfs["directories"]:
+    if _dir_exists(vfs, path):
         return Command(
             update={
                 "messages": [
@@ -37,16 +144,22 @@ def mkdir(
             }
         )
 
-    vfs["directories"].append(path)
+    new_dirs = [path]
+    _add_child(vfs, path)
     # Create parent directories if needed
     parent = os.path.dirname(path)
-    while parent and parent != "/" and parent not in vfs["directories"]:
-        vfs["directories"].append(parent)
+    while parent and parent != "/" and not _dir_exists(vfs, parent):
+        new_dirs.append(parent)
+        _add_child(vfs, parent)
         parent = os.path.dirname(parent)
 
+    # Only the delta is returned; virtual_fs_reducer merges it into the state
     return Command(
         update={
-            "virtual_fs": vfs,
+            "virtual_fs": {
+                "directories": new_dirs,
+                "children": _children_patch(vfs, new_dirs, indexed),
+            },
             "messages": [
                 ToolMessage(f"Created directory {path}", tool_call_id=tool_call_id)
             ],
@@ -61,9 +174,7 @@ def cd(
     tool_call_id: Annotated[str, InjectedToolCallId],
 ) -> Command:
     """Change current directory in the virtual filesystem."""
-    vfs = state.get(
-        "virtual_fs", {"files": {}, "directories": ["/"], "current_directory": "/"}
-    )
+    vfs = state.get("virtual_fs") or _new_vfs()
 
     # Handle relative and absolute paths
     if path == "..":
@@ -77,7 +188,7 @@ def cd(
     new_path = os.path.normpath(new_path)
 
     # Check if directory exists
-    if new_path != "/" and new_path not in vfs["directories"]:
+    if not _dir_exists(vfs, new_path):
         return Command(
             update={
                 "messages": [
@@ -89,10 +200,9 @@ def cd(
             }
         )
 
-    vfs["current_directory"] = new_path
     return Command(
         update={
-            "virtual_fs": vfs,
+            "virtual_fs": {"current_directory": new_path},
             "messages": [
                 ToolMessage(
                     f"Changed directory to {new_path}", tool_call_id=tool_call_id
@@ -107,7 +217,7 @@ def pwd(
     state: Annotated[DeepAgentState, InjectedState],
 ) -> str:
     """Print working directory."""
-    vfs = state.get("virtual_fs", {"current_directory": "/"})
+    vfs = state.get("virtual_fs") or _EMPTY_VFS
     return vfs["current_directory"]
 
 
@@ -117,9 +227,7 @@ def ls_enhanced(
     path: Optional[str] = None,
 ) -> str:
     """List files and directories with metadata."""
-    vfs = state.get(
-        "virtual_fs", {"files": {}, "directories": [], "current_directory": "/"}
-    )
+    vfs = state.get("virtual_fs") or _new_vfs()
 
     # Use current directory if no path specified
     if path is None:
@@ -130,28 +238,32 @@ def ls_enhanced(
     # Normalize path
     path = os.path.normpath(path)
 
-    # List contents
+    # List only the children of path via the parent index
+    children = _children_index(vfs).get(path, ())
+    files = vfs.get("files", {})
+    # Children all live directly under path, so names are plain slices
+    prefix_len = 1 if path == "/" else len(path) + 1
+    dirs = []
+    add_dir = dirs.append
     contents = []
-
-    # Add directories
-    for dir_path in sorted(vfs["directories"]):
-        if os.path.dirname(dir_path) == path:
-            contents.append(f"d rwxr-xr-x  {os.path.basename(dir_path)}/")
-
-    # Add files
-    for file_path, file_data in sorted(vfs["files"].items()):
-        if os.path.dirname(file_path) == path:
-            if isinstance(file_data, dict) and "metadata" in file_data:
-                metadata = file_data["metadata"]
-                size = metadata.get("size", 0)
-                perms = metadata.get("permissions", "rw-r--r--")
-                contents.append(f"- {perms}  {size:8d}  {os.path.basename(file_path)}")
-            else:
-                # Legacy file format
-                size = len(file_data) if isinstance(file_data, str) else 0
-                contents.append(
-                    f"- rw-r--r--  {size:8d}  {os.path.basename(file_path)}"
-                )
+    add_file = contents.append
+
+    # Directories first, then files, in a single pass
+    for child in children:
+        file_data = files.get(child)
+        name = child[prefix_len:]
+        if file_data is None:
+            add_dir(_DIR_FMT(name))
+        elif isinstance(file_data, dict) and "metadata" in file_data:
+            metadata = file_data["metadata"]
+            size = metadata.get("size", 0)
+            perms = metadata.get("permissions", _DEFAULT_PERMS)
+            add_file(_FILE_FMT(perms, size, name))
+        else:
+            # Legacy file format
+            size = len(file_data) if isinstance(file_data, str) else 0
+            add_file(_FILE_FMT(_DEFAULT_PERMS, size, name))
+    contents[:0] = dirs
 
     if not contents:
         return f"Directory {path} is empty"
@@ -165,7 +277,7 @@ def file_history(
     state: Annotated[DeepAgentState, InjectedState],
 ) -> str:
     """Show version history of a file."""
-    vfs = state.get("virtual_fs", {"files": {}})
+    vfs = state.get("virtual_fs") or _EMPTY_VFS
 
     # Normalize path
     if not file_path.startswith("/"):
@@ -187,15 +299,19 @@ def file_history(
     history = file_data.get("history", [])
 
     result = [f"Current version: {metadata['version']}"]
-    result.append(f"Modified: {metadata['modified_at']}")
+    result.append(f"Modified: {_timestamp(metadata, 'modified_at')}")
     result.append(f"Size: {metadata['size']} bytes")
 
     if history:
         result.append("\nVersion history:")
-        for i, version in enumerate(reversed(history[-5:])):  # Show last 5 versions
-            result.append(
-                f"  v{version['version']}: {version['modified_at']} ({len(version['content'])} bytes)"
-            )
+        # Show last 5 versions (history may be a deque, which cannot be sliced)
+        last_versions = itertools.islice(reversed(history), 5)
+        for i, version in enumerate(last_versions):
+            size = version.get("size")
+            if size is None:
+                size = len(_file_content(vfs, version))
+            modified = _timestamp(version, "modified_at")
+            result.append(f"  v{version['version']}: {modified} ({size} bytes)")
 
     return "\n".join(result)
 
@@ -208,7 +324,8 @@ def cp(
     tool_call_id: Annotated[str, InjectedToolCallId],
 ) -> Command:
     """Copy a file in the virtual filesystem."""
-    vfs = state.get("virtual_fs", {"files": {}, "current_directory": "/"})
+    vfs = state.get("virtual_fs") or _new_vfs()
+    indexed = "children" in vfs
     files = state.get("files", {})
 
     # Normalize paths
@@ -216,17 +333,14 @@ def cp(
         source = os.path.join(vfs.get("current_directory", "/"), source)
     if not destination.startswith("/"):
         destination = os.path.join(vfs.get("current_directory", "/"), destination)
+    destination = os.path.normpath(destination)
 
     # Check source exists
     content = None
     if source in vfs.get("files", {}):
-        file_data = vfs["files"][source]
-        if isinstance(file_data, dict):
-            content = file_data.get("content", "")
-        else:
-            content = file_data
+        content = _file_content(vfs, vfs["files"][source])
     elif source in files:
-        content = files[source]
+        content = _file_content(vfs, files[source])
     else:
         return Command(
             update={
@@ -238,30 +352,34 @@ def cp(
             }
         )
 
-    # Create copy
-    now = datetime.now().isoformat()
+    # Create copy, storing the content once by hash. Timestamps are kept as
+    # integers and only formatted when displayed.
+    now_ns = time.time_ns()
+    digest = _store_blob(vfs, content)
     new_file = {
-        "content": content,
+        "content_ref": digest,
         "metadata": {
-            "created_at": now,
-            "modified_at": now,
+            "created_at_ns": now_ns,
+            "modified_at_ns": now_ns,
             "size": len(content),
-            "permissions": "rw-r--r--",
+            "permissions": _DEFAULT_PERMS,
             "version": 1,
         },
     }
 
-    if "files" not in vfs:
-        vfs["files"] = {}
-    vfs["files"][destination] = new_file
-
-    # Also update legacy files for compatibility
-    files[destination] = content
+    vfs.setdefault("files", {})[destination] = new_file
+    _add_child(vfs, destination)
 
+    # Only the delta is returned; virtual_fs_reducer and file_reducer merge it.
+    # Legacy files are also updated for compatibility.
     return Command(
         update={
-            "virtual_fs": vfs,
-            "files": files,
+            "virtual_fs": {
+                "files": {destination: new_file},
+                "blobs": {digest: content},
+                "children": _children_patch(vfs, [destination], indexed),
+            },
+            "files": {destination: content},
             "messages": [
                 ToolMessage(
                     f"Copied {source} to {destination}", tool_call_id=tool_call_id
@@ -271,34 +389,97 @@ def cp(
     )
 
 
-@tool
-def human_input(
+def _human_input_update(
     prompt: str,
-    state: Annotated[DeepAgentState, InjectedState],
-    tool_call_id: Annotated[str, InjectedToolCallId],
-    context: Optional[str] = None,
+    tool_call_id: str,
+    context: Optional[str],
+    response: Optional[str],
 ) -> Command:
-    """Request input from a human operator."""
     feedback_entry = {
-        "timestamp": datetime.now().isoformat(),
+        "timestamp_ns": time.time_ns(),
         "prompt": prompt,
         "context": context,
-        "response": None,  # This would be filled by the human-in-the-loop callback
+        "response": response,  # None until a human answers via resolve_human
         "tool_call_id": tool_call_id,
     }
 
-    human_feedback = state.get("human_feedback", [])
-    human_feedback.append(feedback_entry)
-
-    # In a real implementation, this would trigger a callback to get human input
-    # For now, we'll return a placeholder response
-    response_msg = f"Human input requested: {prompt}"
-    if context:
-        response_msg += f"\nContext: {context}"
+    if response is None:
+        # No answer (yet): return a placeholder so the agent can keep going
+        response_msg = f"Human input requested: {prompt}"
+        if context:
+            response_msg += f"\nContext: {context}"
+    else:
+        response_msg = f"Human response: {response}"
 
     return Command(
         update={
-            "human_feedback": human_feedback,
+            # Only the new entry; the state reducer appends it, so parallel
+            # human_input calls in one step each add theirs
+            "human_feedback": [feedback_entry],
             "messages": [ToolMessage(response_msg, tool_call_id=tool_call_id)],
         }
     )
+
+
+def _human_input(
+    prompt: str,
+    state: Annotated[DeepAgentState, InjectedState],
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    config: RunnableConfig,
+    context: Optional[str] = None,
+) -> Command:
+    return _human_input_update(prompt, tool_call_id, context, None)
+
+
+async def _ahuman_input(
+    prompt: str,
+    state: Annotated[DeepAgentState, InjectedState],
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    config: RunnableConfig,
+    context: Optional[str] = None,
+) -> Command:
+    response = None
+    timeout = config.get("configurable", {}).get("human_input_timeout")
+    if timeout:
+        # Wait on a future instead of blocking: other branches keep running
+        future = asyncio.get_running_loop().create_future()
+        _PENDING_HUMAN[tool_call_id] = future
+        try:
+            response = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            _PENDING_HUMAN.pop(tool_call_id, None)
+    return _human_input_update(prompt, tool_call_id, context, response)
+
+
+human_input = StructuredTool.from_function(
+    func=_human_input,
+    coroutine=_ahuman_input,
+    name="human_input",
+    description="Request input from a human operator.",
+)
+
+
+def pending_human_inputs() -> List[str]:
+    """Tool call ids of `human_input` requests waiting for a response."""
+    return list(_PENDING_HUMAN)
+
+
+def resolve_human(tool_call_id: str, response: str) -> bool:
+    """Answer a pending `human_input` request.
+
+    Requests only wait for an answer when the agent runs asynchronously with
+    `configurable={"human_input_timeout": seconds}`. Safe to call from any
+    thread.
+
+    Returns:
+        bool: False if no request with this tool call id is pending.
+    """
+    future = _PENDING_HUMAN.pop(tool_call_id, None)
+    if future is None or future.done():
+        return False
+    future.get_loop().call_soon_threadsafe(
+        lambda: future.done() or future.set_result(response)
+    )
+    return True
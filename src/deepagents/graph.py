@@ -1,20 +1,32 @@
-from deepagents.sub_agent import _create_task_tool, SubAgent
-from deepagents.model import get_default_model, get_model
+from deepagents.sub_agent import (
+    _create_subagent_tools,
+    _index_tools,
+    _supports_prompt_cache,
+    SubAgent,
+)
+from deepagents.model import PromptHashCache, get_default_model, get_model
 from deepagents.tools import write_todos, write_file, read_file, ls, edit_file
+from deepagents.compiler import create_compiler_agent
+from deepagents.speculative import create_speculative_agent
 from deepagents.state import DeepAgentState
-from typing import Sequence, Union, Callable, Any, TypeVar, Type, Optional, Dict, List
+from typing import Sequence, Union, Callable, Any, TypeVar, Type, Optional, Dict, List, Literal
 from langchain_core.tools import BaseTool
-from langchain_core.language_models import LanguageModelLike
+from langchain_core.caches import BaseCache
+from langchain_core.language_models import BaseChatModel, LanguageModelLike
+from langchain_core.messages import SystemMessage
 from langgraph.graph import StateGraph
 from langgraph.prebuilt import create_react_agent
-from dotenv import load_dotenv
-
-load_dotenv()
+import asyncio
+import functools
+import sys
 
 StateSchema = TypeVar("StateSchema", bound=DeepAgentState)
 StateSchemaType = Type[StateSchema]
 
-DEFAULT_BASE_PROMPT = """You have access to a number of standard tools
+# Process-wide response cache used when `llm_cache=True`
+_DEFAULT_LLM_CACHE = PromptHashCache(maxsize=1024)
+
+DEFAULT_BASE_PROMPT = sys.intern("""You have access to a number of standard tools
 
 ## `write_todos`
 
@@ -24,7 +36,43 @@ These tools are also EXTREMELY helpful for planning tasks, and for breaking down
 It is critical that you mark todos as completed as soon as you are done with a task. Do not batch up multiple tasks before marking them as completed.
 ## `task`
 
-- When doing web search, prefer to use the `task` tool in order to reduce context usage."""
+- When doing web search, prefer to use the `task` tool in order to reduce context usage.""")
+
+
+@functools.lru_cache(maxsize=128)
+def _render_prompt(
+    instructions: str,
+    system_prompt: Optional[str],
+    use_default_prompt: bool,
+    prompt_cache: bool = False,
+) -> Union[str, SystemMessage]:
+    """Render the agent prompt, once per configuration.
+
+    With `prompt_cache` (Anthropic models), the default base prompt is sent as
+    its own `cache_control` block ahead of the instructions: Anthropic caches
+    everything up to that block, so it is reused across agents and steps
+    whatever the instructions. Otherwise the prompt is a plain string, still
+    with the static base prompt first so it stays a cacheable prefix.
+    """
+    if system_prompt is not None:
+        # Use custom system prompt entirely
+        return system_prompt
+    elif not use_default_prompt:
+        # Use only the provided instructions
+        return instructions
+    elif prompt_cache:
+        return SystemMessage(
+            content=[
+                {
+                    "type": "text",
+                    "text": DEFAULT_BASE_PROMPT,
+                    "cache_control": {"type": "ephemeral"},
+                },
+                {"type": "text", "text": instructions},
+            ]
+        )
+    else:
+        return DEFAULT_BASE_PROMPT + "\n\n" + instructions
 
 
 def create_deep_agent(
@@ -36,6 +84,9 @@ def create_deep_agent(
     system_prompt: Optional[str] = None,
     use_default_prompt: bool = True,
     human_in_the_loop: Optional[Callable] = None,
+    planner_mode: Literal["react", "compiler"] = "react",
+    llm_cache: Union[bool, BaseCache, None] = None,
+    speculative: bool = False,
 ) -> StateGraph:
     """Create a deep agent with enhanced capabilities.
 
@@ -57,48 +108,114 @@ def create_deep_agent(
         system_prompt: Custom system prompt to completely override the default.
         use_default_prompt: Whether to append the default base prompt to instructions.
         human_in_the_loop: Optional callback for human intervention during execution.
+        planner_mode: "react" runs the standard one-call-at-a-time ReAct loop.
+            "compiler" plans all tool calls up front as a dependency graph and
+            runs independent calls (including subagent tasks) concurrently.
+        llm_cache: Cache model responses keyed on the full request (messages,
+            bound tools and model parameters), so identical calls skip the
+            provider roundtrip. Pass True for a shared in-memory
+            `PromptHashCache` or any LangChain `BaseCache` instance.
+        speculative: Stream the model and start tool calls as soon as their
+            arguments are complete, overlapping tool and model latency. Only
+            applies to the "react" planner mode and to async invocation.
 
     Returns:
         StateGraph: A configured LangGraph agent.
     """
-    # Build the prompt based on configuration
-    if system_prompt is not None:
-        # Use custom system prompt entirely
-        prompt = system_prompt
-    elif use_default_prompt:
-        # Combine instructions with default base prompt
-        prompt = instructions + "\n\n" + DEFAULT_BASE_PROMPT
-    else:
-        # Use only the provided instructions
-        prompt = instructions
-
     # Initialize built-in tools
     built_in_tools = [write_todos, write_file, read_file, ls, edit_file]
 
-    # Initialize model if not provided
+    # Initialize model if not provided (get_model reuses one client per config)
     if model is None:
         model = get_model(provider="cerebras")
 
+    # Attach the response cache to the model
+    if llm_cache:
+        if not isinstance(model, BaseChatModel):
+            raise ValueError("llm_cache requires a chat model instance.")
+        cache = _DEFAULT_LLM_CACHE if llm_cache is True else llm_cache
+        model = model.model_copy(update={"cache": cache})
+
     # Initialize state schema if not provided
     state_schema = state_schema or DeepAgentState
 
-    # Create task tool with subagents
-    task_tool = _create_task_tool(
-        list(tools) + built_in_tools,
+    # Index tools by name once so subagent tool lists resolve in O(k)
+    subagent_base_tools = list(tools) + built_in_tools
+    tool_index = _index_tools(subagent_base_tools)
+
+    # Create task and spawn_agents tools with subagents
+    subagent_tools = _create_subagent_tools(
+        subagent_base_tools,
         instructions,
         subagents or [],
         model,
         state_schema,
         human_in_the_loop=human_in_the_loop,
+        tool_index=tool_index,
     )
 
     # Combine all tools
-    all_tools = built_in_tools + list(tools) + [task_tool]
+    all_tools = built_in_tools + list(tools) + subagent_tools
+
+    # Build the prompt based on configuration. The compiler planner extends
+    # the prompt text, so only the ReAct loops get the cached message form.
+    prompt = _render_prompt(
+        instructions,
+        system_prompt,
+        use_default_prompt,
+        prompt_cache=planner_mode != "compiler" and _supports_prompt_cache(model),
+    )
 
     # Create and return the agent
+    if planner_mode == "compiler":
+        return create_compiler_agent(
+            model,
+            prompt=prompt,
+            tools=all_tools,
+            state_schema=state_schema,
+        )
+    elif planner_mode != "react":
+        raise ValueError(
+            f"Unsupported planner_mode: {planner_mode}. Use 'react' or 'compiler'."
+        )
+    if speculative:
+        return create_speculative_agent(
+            model,
+            prompt=prompt,
+            tools=all_tools,
+            state_schema=state_schema,
+        )
     return create_react_agent(
         model,
         prompt=prompt,
         tools=all_tools,
         state_schema=state_schema,
     )
+
+
+async def run_batch_async(
+    agent: Any,
+    tasks: Sequence[Dict[str, Any]],
+    max_concurrency: int = 8,
+) -> List[Dict[str, Any]]:
+    """Run several independent agent invocations concurrently.
+
+    Each task is dispatched through `agent.ainvoke`, with at most
+    `max_concurrency` runs in flight at once. Works with the graph returned by
+    `create_deep_agent` as well as with bindings such as `agent.with_config(...)`.
+
+    Args:
+        agent: The agent (or any LangChain runnable) to invoke.
+        tasks: The inputs to pass to `ainvoke`, one per run.
+        max_concurrency: Maximum number of runs executing at the same time.
+
+    Returns:
+        List[Dict[str, Any]]: The results, in the same order as `tasks`.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def bound_ainvoke(task: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            return await agent.ainvoke(task)
+
+    return await asyncio.gather(*[bound_ainvoke(task) for task in tasks])
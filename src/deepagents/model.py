@@ -1,17 +1,404 @@
-from langchain_anthropic import ChatAnthropic
-from langchain_cerebras import ChatCerebras
-from typing import Literal, Optional
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.caches import BaseCache
+from langchain_core.language_models import BaseChatModel, LanguageModelInput
+from langchain_core.messages import BaseMessage
+from langchain_core.globals import set_llm_cache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+from typing import Any, Callable, Dict, List, Literal, Optional, Sequence
 from dotenv import load_dotenv
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import warnings
 
-load_dotenv()
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def get_default_model():
-    """Get the default model (Claude)."""
-    return ChatAnthropic(model_name="claude-sonnet-4-20250514", max_tokens=64000)
+# Default location of the persistent response cache
+_DEFAULT_CACHE_DB = os.path.join("~", ".cache", "deepagents", "llm.sqlite")
 
+# langchain_core.load.loads is flagged as beta; silence that warning for the
+# calls made here only, once, rather than toggling filters per lookup
+warnings.filterwarnings(
+    "ignore",
+    message="The function `loads` is in beta",
+    category=LangChainBetaWarning,
+    module=__name__,
+)
 
-def get_cerebras_model(model: str = "qwen-3-235b-a22b-instruct-2507", **kwargs):
+
+def _loads(data: str) -> Any:
+    """Parse JSON with orjson when installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _dumps_sorted(value: Any) -> bytes:
+    """Serialize to canonical (key-sorted, compact UTF-8) JSON bytes.
+
+    Uses orjson when installed. The stdlib fallback emits the same bytes, so
+    cache keys do not depend on which backend is available.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            # e.g. integers beyond 64 bits
+            pass
+    return json.dumps(
+        value, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    ).encode()
+
+
+class PromptHashCache(BaseCache):
+    """In-memory LLM response cache keyed by a SHA256 of the request.
+
+    LangGraph assigns a fresh id to every message, so caches keyed on the raw
+    serialized prompt never hit inside an agent loop. Message ids are dropped
+    before hashing; everything else (content, tool calls, bound tools and
+    model parameters) is part of the key. Safe to share between threads.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None):
+        self._cache: Dict[str, Sequence[Generation]] = {}
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        try:
+            messages = _loads(prompt)
+        except ValueError:
+            messages = prompt
+        if isinstance(messages, list):
+            for message in messages:
+                if isinstance(message, dict):
+                    message.get("kwargs", {}).pop("id", None)
+        return hashlib.sha256(_dumps_sorted([messages, llm_string])).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        return self._cache.get(self._key(prompt, llm_string))
+
+    def update(
+        self, prompt: str, llm_string: str, return_val: Sequence[Generation]
+    ) -> None:
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            if self._maxsize is not None and len(self._cache) >= self._maxsize:
+                # Evict the oldest entry (dicts preserve insertion order)
+                del self._cache[next(iter(self._cache))]
+            self._cache[key] = return_val
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    async def alookup(
+        self, prompt: str, llm_string: str
+    ) -> Optional[Sequence[Generation]]:
+        return self.lookup(prompt, llm_string)
+
+    async def aupdate(
+        self, prompt: str, llm_string: str, return_val: Sequence[Generation]
+    ) -> None:
+        self.update(prompt, llm_string, return_val)
+
+    async def aclear(self, **kwargs: Any) -> None:
+        self.clear()
+
+class SQLitePromptCache(BaseCache):
+    """Persistent LLM response cache in SQLite, keyed like `PromptHashCache`.
+
+    Hits survive restarts and are shared between processes (CI runs, worker
+    pools). The database runs in WAL mode so concurrent readers do not block
+    a writer, and one connection is shared by all threads of the process.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        path = os.path.expanduser(path or _DEFAULT_CACHE_DB)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache "
+                "(key TEXT PRIMARY KEY, generations TEXT NOT NULL)"
+            )
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = PromptHashCache._key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT generations FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return [loads(generation) for generation in json.loads(row[0])]
+
+    def update(
+        self, prompt: str, llm_string: str, return_val: Sequence[Generation]
+    ) -> None:
+        key = PromptHashCache._key(prompt, llm_string)
+        generations = json.dumps([dumps(generation) for generation in return_val])
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, generations) VALUES (?, ?)",
+                (key, generations),
+            )
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM llm_cache")
+
+
+def enable_persistent_cache(path: Optional[str] = None) -> SQLitePromptCache:
+    """Install a `SQLitePromptCache` as the process-wide LLM cache.
+
+    Args:
+        path: Database file (default: ~/.cache/deepagents/llm.sqlite).
+
+    Returns:
+        The installed cache.
+    """
+    cache = SQLitePromptCache(path)
+    set_llm_cache(cache)
+    return cache
+
+
+class BatchedModel:
+    """Chat model wrapper with bounded-concurrency batch entry points.
+
+    `batch`/`abatch` fan a list of prompts out concurrently, at most
+    `max_concurrency` requests in flight, so network latency overlaps instead
+    of adding up. Every other attribute is forwarded to the wrapped model;
+    pass `.llm` where a LangChain chat model instance is required (e.g.
+    `create_deep_agent(model=...)`).
+    """
+
+    def __init__(self, llm: BaseChatModel, max_concurrency: int = 10):
+        self.llm = llm
+        self.max_concurrency = max_concurrency
+
+    def batch(
+        self,
+        prompts: Sequence[LanguageModelInput],
+        max_concurrency: Optional[int] = None,
+    ) -> List[BaseMessage]:
+        """Run prompts concurrently in a thread pool, preserving order."""
+        return self.llm.batch(
+            list(prompts),
+            config={"max_concurrency": max_concurrency or self.max_concurrency},
+        )
+
+    async def abatch(
+        self,
+        prompts: Sequence[LanguageModelInput],
+        max_concurrency: Optional[int] = None,
+    ) -> List[BaseMessage]:
+        """Await prompts concurrently on the event loop, preserving order."""
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+
+        async def guarded(prompt: LanguageModelInput) -> BaseMessage:
+            async with semaphore:
+                return await self.llm.ainvoke(prompt)
+
+        return await asyncio.gather(*[guarded(prompt) for prompt in prompts])
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
+
+
+def setup_llm_cache(
+    backend: Literal["memory", "sqlite"] = "memory", path: Optional[str] = None
+) -> BaseCache:
+    """Install a process-wide response cache for all LangChain models.
+
+    Args:
+        backend: "memory" for an in-process `PromptHashCache`, or "sqlite" for
+            a persistent `SQLitePromptCache`.
+        path: Database file for the sqlite backend
+            (default: ~/.cache/deepagents/llm.sqlite).
+
+    Returns:
+        The installed cache.
+    """
+    if backend == "memory":
+        cache = PromptHashCache()
+    elif backend == "sqlite":
+        return enable_persistent_cache(path)
+    else:
+        raise ValueError(
+            f"Unsupported cache backend: {backend}. Use 'memory' or 'sqlite'."
+        )
+    set_llm_cache(cache)
+    return cache
+
+
+@functools.lru_cache(maxsize=1)
+def _ensure_env() -> bool:
+    """Load `.env` once per process, on first model construction.
+
+    Set DEEPAGENTS_SKIP_DOTENV=1 to skip it, e.g. in workers that inherit a
+    prepared environment.
+    """
+    if os.getenv("DEEPAGENTS_SKIP_DOTENV") == "1":
+        return False
+    load_dotenv()
+    return True
+
+
+@functools.lru_cache(maxsize=1)
+def _auto_llm_cache() -> Optional[BaseCache]:
+    """Install the cache selected by the environment, once per process.
+
+    DEEPAGENTS_CACHE_DB enables the persistent cache: a database path, or "1"
+    for the default location. Otherwise DEEPAGENTS_LLM_CACHE selects "1" or
+    "memory" for the in-memory cache, "sqlite" for the persistent one.
+    """
+    cache_db = os.getenv("DEEPAGENTS_CACHE_DB", "").strip()
+    if cache_db:
+        return enable_persistent_cache(None if cache_db == "1" else cache_db)
+    backend = os.getenv("DEEPAGENTS_LLM_CACHE", "").strip().lower()
+    if backend in ("", "0", "false"):
+        return None
+    return setup_llm_cache("sqlite" if backend == "sqlite" else "memory")
+
+
+# Provider classes, imported on first use so only the chosen provider pays
+# for its import
+_ChatAnthropic = None
+_ChatCerebras = None
+
+
+def _chat_anthropic():
+    global _ChatAnthropic
+    if _ChatAnthropic is None:
+        from langchain_anthropic import ChatAnthropic
+
+        _ChatAnthropic = ChatAnthropic
+    return _ChatAnthropic
+
+
+def _chat_cerebras():
+    global _ChatCerebras
+    if _ChatCerebras is None:
+        from langchain_cerebras import ChatCerebras
+
+        _ChatCerebras = ChatCerebras
+    return _ChatCerebras
+
+
+def _kwargs_key(kwargs: Dict[str, Any]) -> Optional[tuple]:
+    """Hashable cache key for factory kwargs, or None if a value is unhashable."""
+    items = tuple(sorted(kwargs.items()))
+    try:
+        hash(items)
+    except TypeError:
+        return None
+    return items
+
+
+# Opts older API versions and compatible gateways into prompt caching
+_PROMPT_CACHE_HEADERS = {"anthropic-beta": "prompt-caching-2024-07-31"}
+
+
+def _anthropic_kwargs(
+    enable_prompt_cache: bool, kwargs: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Add the prompt caching header to ChatAnthropic kwargs when enabled."""
+    if not enable_prompt_cache:
+        return kwargs
+    headers = {**_PROMPT_CACHE_HEADERS, **(kwargs.get("default_headers") or {})}
+    return {**kwargs, "default_headers": headers}
+
+
+# Default model per provider, the single source for the factories below
+_DEFAULTS = {
+    "claude": "claude-sonnet-4-20250514",
+    "cerebras": "qwen-3-235b-a22b-instruct-2507",
+}
+
+_PROVIDER_BUILDERS = {
+    "claude": lambda model, enable_prompt_cache, kwargs: _chat_anthropic()(
+        model_name=model,
+        max_tokens=64000,
+        **_anthropic_kwargs(enable_prompt_cache, kwargs),
+    ),
+    "cerebras": lambda model, enable_prompt_cache, kwargs: _chat_cerebras()(
+        model=model, max_tokens=64000, **kwargs
+    ),
+}
+
+
+def _build_once(maxsize: int) -> Callable:
+    """Memoize a model builder so each configuration is built exactly once.
+
+    Unlike `functools.lru_cache`, concurrent first calls with the same
+    arguments do not each construct a client: the build runs under a lock,
+    with a lock-free fast path once the instance exists.
+    """
+
+    def decorator(builder: Callable) -> Callable:
+        instances: Dict[tuple, Any] = {}
+        lock = threading.Lock()
+
+        @functools.wraps(builder)
+        def wrapper(*args: Any) -> Any:
+            instance = instances.get(args)
+            if instance is not None:
+                return instance
+            with lock:
+                instance = instances.get(args)
+                if instance is None:
+                    if len(instances) >= maxsize:
+                        # Evict the oldest configuration
+                        del instances[next(iter(instances))]
+                    instance = instances[args] = builder(*args)
+            return instance
+
+        wrapper.cache_clear = instances.clear
+        return wrapper
+
+    return decorator
+
+
+@_build_once(maxsize=2)
+def _default_model_instance(enable_prompt_cache: bool):
+    return _PROVIDER_BUILDERS["claude"](_DEFAULTS["claude"], enable_prompt_cache, {})
+
+
+def get_default_model(enable_prompt_cache: bool = True):
+    """Get the default model (Claude), a process-wide thread-safe singleton.
+
+    Args:
+        enable_prompt_cache: Send the Anthropic prompt caching header, so the
+            `cache_control` blocks set by `create_deep_agent` are honored.
+    """
+    _ensure_env()
+    _auto_llm_cache()
+    return _default_model_instance(enable_prompt_cache)
+
+
+@_build_once(maxsize=32)
+def _cached_cerebras_model(model: str, kwargs_items: tuple):
+    return _chat_cerebras()(model=model, **dict(kwargs_items))
+
+
+def get_cerebras_model(model: str = _DEFAULTS["cerebras"], **kwargs):
     """Get a Cerebras model instance.
+
+    Instances are reused for repeated calls with the same (hashable) arguments,
+    and built once even when first requested from several threads.
     
     Args:
         model: The Cerebras model to use (default: qwen-3-235b-a22b-instruct-2507)
@@ -20,31 +407,66 @@ def get_cerebras_model(model: str = "qwen-3-235b-a22b-instruct-2507", **kwargs):
     Returns:
         ChatCerebras instance
     """
-    return ChatCerebras(model=model, **kwargs)
+    _ensure_env()
+    _auto_llm_cache()
+    key = _kwargs_key(kwargs)
+    if key is None:
+        return _chat_cerebras()(model=model, **kwargs)
+    return _cached_cerebras_model(model, key)
+
+
+def _build_model(
+    provider: str,
+    model: Optional[str],
+    enable_prompt_cache: bool,
+    kwargs: Dict[str, Any],
+):
+    try:
+        builder = _PROVIDER_BUILDERS[provider]
+    except KeyError:
+        raise ValueError(
+            f"Unsupported provider: {provider}. Use 'claude' or 'cerebras'."
+        ) from None
+    return builder(model or _DEFAULTS[provider], enable_prompt_cache, kwargs)
+
+
+@_build_once(maxsize=32)
+def _cached_model(
+    provider: str, model: Optional[str], enable_prompt_cache: bool, kwargs_items: tuple
+):
+    return _build_model(provider, model, enable_prompt_cache, dict(kwargs_items))
 
 
 def get_model(
     provider: Literal["claude", "cerebras"] = "claude",
     model: Optional[str] = None,
+    enable_prompt_cache: bool = True,
+    batched: bool = False,
     **kwargs
 ):
     """Get a model instance from the specified provider.
+
+    Instances are reused for repeated calls with the same (hashable) arguments,
+    so agents built from the same configuration share one client.
     
     Args:
         provider: The model provider to use ("claude" or "cerebras")
         model: Specific model name (uses provider defaults if not specified)
+        enable_prompt_cache: For Claude, send the prompt caching header so the
+            `cache_control` blocks set by `create_deep_agent` are honored.
+            Ignored for Cerebras, which has no prompt caching.
+        batched: Return the model wrapped in a `BatchedModel`, which adds
+            concurrent `batch`/`abatch` over lists of prompts.
         **kwargs: Additional parameters to pass to the model
     
     Returns:
         Model instance from the specified provider
     """
-    if provider == "claude":
-        if model is None:
-            model = "claude-sonnet-4-20250514"
-        return ChatAnthropic(model_name=model, max_tokens=64000, **kwargs)
-    elif provider == "cerebras":
-        if model is None:
-            model = "qwen-3-235b-a22b-instruct-2507"
-        return ChatCerebras(model=model, max_tokens=64000, **kwargs)
+    _ensure_env()
+    _auto_llm_cache()
+    key = _kwargs_key(kwargs)
+    if key is None:
+        llm = _build_model(provider, model, enable_prompt_cache, kwargs)
     else:
-        raise ValueError(f"Unsupported provider: {provider}. Use 'claude' or 'cerebras'.")
\ No newline at end of file
+        llm = _cached_model(provider, model, enable_prompt_cache, key)
+    return BatchedModel(llm) if batched else llm
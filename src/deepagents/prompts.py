@@ -275,3 +275,23 @@ Usage:
 - Results are returned using cat -n format, with line numbers starting at 1
 - You have the capability to call multiple tools in a single response. It is always better to speculatively read multiple files as a batch that are potentially useful. 
 - If you read a file that exists but has empty contents you will receive a system reminder warning in place of file contents."""
+
+COMPILER_PLANNER_PROMPT = """Before acting, plan every tool call needed to answer the user's latest request.
+
+Available tools and their arguments:
+{tools}
+
+Respond with ONLY a JSON object of the following form and nothing else:
+{{"steps": [{{"id": "1", "tool": "<tool name>", "args": {{...}}, "depends_on": []}}]}}
+
+Rules:
+- Each step calls exactly one of the tools listed above, including `task` for delegating to a subagent.
+- `depends_on` lists the ids of steps whose output this step needs. Steps without a dependency on each other run in parallel, so only add a dependency when it is real.
+- To use the output of an earlier step in your args, write `${{<id>}}` inside a string value, e.g. "Review this analysis: ${{1}}". The step must also list that id in `depends_on`.
+- If the request needs no tools, respond with {{"steps": []}}."""
+
+SPAWN_AGENTS_DESCRIPTION = """Launch several agents at once on work that shares the same context, e.g. reviewing, testing and refactoring the same code.
+
+Put everything the agents have in common (code, requirements, background) in `shared_context` exactly once, and give each fork only its own instructions in `description`. The shared context is sent to every fork as a common, cacheable prefix, and the forks run concurrently.
+
+Each fork takes a `subagent_type` (any agent type available to the `task` tool) and a `description`. The result contains the final report of every fork, in order."""
@@ -0,0 +1,225 @@
+"""ReAct loop with speculative tool execution for deep agents.
+
+The model is streamed, and as soon as the arguments of a tool call form a
+complete JSON object the tool is started in the background while the model
+keeps decoding. When the final message confirms the call (same id, same
+args), the tool node reuses the already running result instead of starting
+the call again; calls the model revised or dropped are cancelled. Model
+latency and tool latency then overlap instead of adding up.
+
+Only tools that do not read the graph state or store are speculated, since
+the state they would see changes once the model message is committed.
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Type, Union
+
+from langchain_core.language_models import LanguageModelLike
+from langchain_core.messages import (
+    AIMessage,
+    SystemMessage,
+    ToolCall,
+    message_chunk_to_message,
+)
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_core.tools import BaseTool, tool
+from langgraph.graph import END, START, StateGraph
+from langgraph.prebuilt import ToolNode, tools_condition
+
+from deepagents.state import DeepAgentState
+
+
+class _SpeculatedTool:
+    """Stand-in for a tool in `ToolNode.tools_by_name` that reuses speculations.
+
+    ToolNode dispatches every call through `tools_by_name[name].ainvoke`, so
+    confirmed speculations are picked up there while ToolNode keeps its own
+    error handling and output validation.
+    """
+
+    def __init__(
+        self,
+        tool: BaseTool,
+        speculations: Dict[str, Tuple[Dict[str, Any], asyncio.Task]],
+    ):
+        self.tool = tool
+        self._speculations = speculations
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs):
+        return self.tool.invoke(input, config, **kwargs)
+
+    async def ainvoke(
+        self, input: Any, config: Optional[RunnableConfig] = None, **kwargs
+    ):
+        speculation = self._speculations.pop(input["id"], None)
+        if speculation is not None:
+            args, task = speculation
+            if args == input["args"]:
+                return await task
+            task.cancel()
+        return await self.tool.ainvoke(input, config, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.tool, name)
+
+
+class SpeculativeToolNode(ToolNode):
+    """ToolNode that can start tool calls before the model has finished."""
+
+    def __init__(self, tools: Sequence[Union[BaseTool, Any]], **kwargs: Any):
+        super().__init__(tools, **kwargs)
+        # Tool call id -> (args, running task)
+        self._speculations: Dict[str, Tuple[Dict[str, Any], asyncio.Task]] = {}
+        for name in list(self.tools_by_name):
+            if self.can_speculate(name):
+                self.tools_by_name[name] = _SpeculatedTool(
+                    self.tools_by_name[name], self._speculations
+                )
+
+    def can_speculate(self, name: str) -> bool:
+        return (
+            name in self.tools_by_name
+            and not self.tool_to_state_args[name]
+            and not self.tool_to_store_arg[name]
+        )
+
+    def speculate(self, call: ToolCall, config: RunnableConfig) -> bool:
+        """Start a tool call in the background. Returns whether it was started."""
+        if call["id"] in self._speculations or not self.can_speculate(call["name"]):
+            return False
+        tool = self.tools_by_name[call["name"]].tool
+        task = asyncio.create_task(tool.ainvoke({**call, "type": "tool_call"}, config))
+        self._speculations[call["id"]] = (call["args"], task)
+        return True
+
+    def discard(self, call_ids: Sequence[str], keep: Sequence[ToolCall]) -> None:
+        """Cancel speculations among `call_ids` that `keep` does not confirm."""
+        confirmed = {call["id"]: call["args"] for call in keep}
+        for call_id in call_ids:
+            speculation = self._speculations.get(call_id)
+            if speculation is None:
+                continue
+            args, task = speculation
+            if confirmed.get(call_id) != args:
+                task.cancel()
+                del self._speculations[call_id]
+
+
+def _completed_tool_calls(
+    message, indices: Optional[Set[Optional[int]]] = None
+) -> List[ToolCall]:
+    """Return the streamed tool calls whose JSON arguments are complete.
+
+    With `indices`, only the tool call chunks at those positions are parsed,
+    so a stream re-parses just the calls its latest chunk extended.
+    """
+    calls = []
+    for chunk in getattr(message, "tool_call_chunks", []):
+        if indices is not None and chunk.get("index") not in indices:
+            continue
+        if not chunk.get("id") or not chunk.get("name"):
+            continue
+        try:
+            args = json.loads(chunk.get("args") or "")
+        except json.JSONDecodeError:
+            continue
+        if isinstance(args, dict):
+            calls.append(
+                {
+                    "name": chunk["name"],
+                    "args": args,
+                    "id": chunk["id"],
+                    "type": "tool_call",
+                }
+            )
+    return calls
+
+
+def create_speculative_agent(
+    model: LanguageModelLike,
+    prompt: Union[str, SystemMessage],
+    tools: Sequence[Union[BaseTool, Any]],
+    state_schema: Optional[Type[DeepAgentState]] = None,
+):
+    """Create a ReAct agent graph that speculatively pre-dispatches tool calls.
+
+    Speculation only happens on the async path (`ainvoke`/`astream`); `invoke`
+    behaves like a regular ReAct agent.
+
+    Args:
+        model: The chat model to use.
+        prompt: The system prompt of the agent, as a string or a SystemMessage.
+        tools: The tools available to the agent.
+        state_schema: The state schema. Should subclass from DeepAgentState.
+
+    Returns:
+        CompiledStateGraph: The compiled agent graph.
+    """
+    if isinstance(model, str):
+        from langchain.chat_models import init_chat_model
+
+        model = init_chat_model(model)
+
+    tools = [
+        t if isinstance(t, BaseTool) else tool(t)
+        for t in tools
+        if not isinstance(t, dict)
+    ]
+    system_message = (
+        prompt if isinstance(prompt, SystemMessage) else SystemMessage(prompt)
+    )
+    tool_node = SpeculativeToolNode(tools)
+    bound_model = model.bind_tools(tools)
+
+    def _finalize(state: DeepAgentState, response: AIMessage) -> Dict[str, Any]:
+        # Same guard as create_react_agent when the recursion limit is near
+        if response.tool_calls and state.get("remaining_steps", 2) < 2:
+            return {
+                "messages": [
+                    AIMessage(
+                        id=response.id,
+                        content="Sorry, need more steps to process this request.",
+                    )
+                ]
+            }
+        return {"messages": [response]}
+
+    def call_model(state: DeepAgentState, config: RunnableConfig) -> Dict[str, Any]:
+        messages = [system_message, *state["messages"]]
+        return _finalize(state, bound_model.invoke(messages, config))
+
+    async def acall_model(
+        state: DeepAgentState, config: RunnableConfig
+    ) -> Dict[str, Any]:
+        messages = [system_message, *state["messages"]]
+        speculated: List[str] = []
+        full = None
+        try:
+            async for chunk in bound_model.astream(messages, config):
+                full = chunk if full is None else full + chunk
+                touched = {
+                    tool_chunk.get("index")
+                    for tool_chunk in getattr(chunk, "tool_call_chunks", [])
+                }
+                if not touched:
+                    continue
+                for call in _completed_tool_calls(full, touched):
+                    if tool_node.speculate(call, config):
+                        speculated.append(call["id"])
+        except BaseException:
+            # Don't leave background tool calls running for a failed turn
+            tool_node.discard(speculated, [])
+            raise
+        response = message_chunk_to_message(full)
+        result = _finalize(state, response)
+        tool_node.discard(speculated, result["messages"][-1].tool_calls)
+        return result
+
+    builder = StateGraph(state_schema or DeepAgentState)
+    builder.add_node("agent", RunnableLambda(call_model, afunc=acall_model))
+    builder.add_node("tools", tool_node)
+    builder.add_edge(START, "agent")
+    builder.add_conditional_edges("agent", tools_condition, ["tools", END])
+    builder.add_edge("tools", "agent")
+    return builder.compile()
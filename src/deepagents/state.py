@@ -1,9 +1,21 @@
 from langgraph.prebuilt.chat_agent_executor import AgentState
-from typing import NotRequired, Annotated, Dict, List, Optional
+from typing import NotRequired, Annotated, Any, Deque, Dict, Iterator, List, Optional
+from typing import Tuple, Union
 from typing import Literal
 from typing_extensions import TypedDict
-from datetime import datetime
+import operator
 import os
+import sys
+
+from deepagents._state_fast import (  # noqa: F401  (re-exported)
+    _DEFAULT_PERMS,
+    _HISTORY_LIMIT,
+    _delta,
+    _intern_file,
+    _merge_vfile,
+    _string_to_vfile,
+    file_reducer,
+)
 
 
 class Todo(TypedDict):
@@ -16,21 +28,32 @@ class Todo(TypedDict):
 
 
 class FileMetadata(TypedDict):
-    """Metadata for virtual files."""
+    """Metadata for virtual files.
+
+    Timestamps are ISO strings, or integer nanoseconds since the epoch in the
+    `*_ns` fields (formatted only for display).
+    """
 
-    created_at: str
-    modified_at: str
+    created_at: NotRequired[str]
+    modified_at: NotRequired[str]
+    created_at_ns: NotRequired[int]
+    modified_at_ns: NotRequired[int]
     size: int
     permissions: str
     version: int
 
 
 class VirtualFile(TypedDict):
-    """Enhanced virtual file with metadata."""
+    """Enhanced virtual file with metadata.
 
-    content: str
+    Files in the virtual filesystem reference their content by SHA256 key in
+    `VirtualFileSystem.blobs` (`content_ref`); legacy entries inline `content`.
+    """
+
+    content: NotRequired[str]
+    content_ref: NotRequired[str]
     metadata: FileMetadata
-    history: NotRequired[List[Dict[str, str]]]
+    history: NotRequired[Deque[Dict[str, Any]]]  # Last _HISTORY_LIMIT versions
 
 
 class VirtualFileSystem(TypedDict):
@@ -39,60 +62,120 @@ class VirtualFileSystem(TypedDict):
     files: Dict[str, VirtualFile]
     directories: List[str]
     current_directory: str
+    children: NotRequired[Dict[str, List[str]]]  # Parent path -> sorted child paths
+    blobs: NotRequired[Dict[str, str]]  # SHA256 -> content, shared by identical files
 
 
-def file_reducer(left: Optional[Dict], right: Optional[Dict]) -> Dict:
-    """Enhanced file reducer that handles virtual filesystem."""
-    if left is None:
-        return right or {}
-    elif right is None:
+def _intern_todo(todo: Dict) -> Dict:
+    """Copy of a todo with its status interned."""
+    return {**todo, "status": sys.intern(todo["status"])}
+
+
+def _apply_delta(content: str, delta: List[List[Any]]) -> str:
+    """Undo one version step recorded by `_delta`."""
+    lines = content.splitlines(keepends=True)
+    # Apply from the end so earlier indices stay valid
+    for start, end, replacement in reversed(delta):
+        lines[start:end] = replacement
+    return "".join(lines)
+
+
+def iter_history(file_data: Dict) -> Iterator[Tuple[Dict[str, Any], str]]:
+    """Yield `(entry, content)` for each history entry of a file, newest first.
+
+    Versions are reconstructed one at a time, so only the current one is held
+    in memory and callers that stop early skip the older deltas entirely.
+    History entries store deltas against the next version; legacy entries
+    store their full `content`.
+    """
+    content = file_data.get("content", "")
+    for entry in reversed(file_data.get("history", ())):
+        if "delta" in entry:
+            content = _apply_delta(content, entry["delta"])
+        else:
+            content = entry.get("content", "")
+        yield entry, content
+
+
+def history_contents(file_data: Dict) -> List[str]:
+    """Reconstruct the content of each history entry of a file, oldest first."""
+    contents = [content for _, content in iter_history(file_data)]
+    contents.reverse()
+    return contents
+
+
+def _content_ref(file_data: Any) -> Optional[str]:
+    """Blob key a virtual file references, if any."""
+    if isinstance(file_data, dict):
+        return file_data.get("content_ref")
+    return None
+
+
+def virtual_fs_reducer(left: Optional[Dict], right: Optional[Dict]) -> Dict:
+    """Merge a partial virtual filesystem update into the current one.
+
+    Tools return only what changed (new `files`/`blobs` entries, new
+    `directories`, added `children` entries, `current_directory`), so an
+    update does not carry the whole filesystem and parallel tool calls in
+    the same step compose instead of conflicting.
+
+    Blobs that an overwritten file referenced are dropped once no file in the
+    merged filesystem references them any more.
+    """
+    if right is None:
         return left
-    else:
-        # Merge files with proper version control
-        merged = left.copy()
-        for path, file_data in right.items():
-            if isinstance(file_data, str):
-                # Convert simple string content to VirtualFile
-                now = datetime.now().isoformat()
-                merged[path] = {
-                    "content": file_data,
-                    "metadata": {
-                        "created_at": now,
-                        "modified_at": now,
-                        "size": len(file_data),
-                        "permissions": "rw-r--r--",
-                        "version": 1,
-                    },
-                }
-            elif isinstance(file_data, dict) and "content" in file_data:
-                # Update existing file with version increment
-                if path in merged and isinstance(merged[path], dict):
-                    old_content = merged[path].get("content", "")
-                    if old_content != file_data["content"]:
-                        # Add to history
-                        history = merged[path].get("history", [])
-                        history.append(
-                            {
-                                "content": old_content,
-                                "modified_at": merged[path]["metadata"]["modified_at"],
-                                "version": merged[path]["metadata"]["version"],
-                            }
-                        )
-                        file_data["history"] = history[:10]  # Keep last 10 versions
-                        file_data["metadata"]["version"] = (
-                            merged[path]["metadata"]["version"] + 1
-                        )
-                merged[path] = file_data
-            else:
-                merged[path] = file_data
-        return merged
+    if left is None:
+        left = {"files": {}, "directories": [], "current_directory": "/"}
+    merged = dict(left)
+    released = set()
+    for key, value in right.items():
+        if key == "files":
+            previous = merged.get(key, {})
+            for path, file_data in value.items():
+                ref = _content_ref(previous.get(path))
+                if ref is not None and ref != _content_ref(file_data):
+                    released.add(ref)
+            merged[key] = {**previous, **value}
+        elif key == "blobs":
+            merged[key] = {**merged.get(key, {}), **value}
+        elif key == "children":
+            # Union each parent's sorted children, so sibling lists sent by
+            # parallel calls from the same state do not overwrite each other
+            children = dict(merged.get(key, {}))
+            for parent, paths in value.items():
+                children[parent] = sorted({*children.get(parent, ()), *paths})
+            merged[key] = children
+        elif key == "directories":
+            existing = set(merged.get(key, []))
+            merged[key] = merged.get(key, []) + [
+                d for d in dict.fromkeys(value) if d not in existing
+            ]
+        else:
+            merged[key] = value
+    if released and merged.get("blobs"):
+        released.difference_update(
+            _content_ref(file_data) for file_data in merged["files"].values()
+        )
+        if released:
+            merged["blobs"] = {
+                ref: content
+                for ref, content in merged["blobs"].items()
+                if ref not in released
+            }
+    return merged
 
 
 class DeepAgentState(AgentState):
     """Enhanced agent state with robust features."""
 
     todos: NotRequired[List[Todo]]
-    files: Annotated[NotRequired[Dict[str, str]], file_reducer]  # Legacy support
-    virtual_fs: NotRequired[VirtualFileSystem]
+    files: Annotated[
+        NotRequired[Dict[str, Union[str, VirtualFile]]], file_reducer
+    ]  # Legacy support
+    virtual_fs: Annotated[NotRequired[VirtualFileSystem], virtual_fs_reducer]
     benchmarks: NotRequired[Dict[str, float]]  # Store benchmark results
-    human_feedback: NotRequired[List[Dict[str, str]]]  # Store human feedback
+    human_feedback: Annotated[
+        NotRequired[List[Dict[str, Any]]], operator.add
+    ]  # Store human feedback, appended to by each human_input call
+    plan: NotRequired[List[Dict[str, Any]]]  # Tool-call DAG from the compiler planner
+    step_results: NotRequired[Dict[str, Any]]  # Planned step outputs keyed by step id
@@ -1,11 +1,21 @@
-from deepagents.prompts import TASK_DESCRIPTION_PREFIX, TASK_DESCRIPTION_SUFFIX
+from deepagents.prompts import (
+    SPAWN_AGENTS_DESCRIPTION,
+    TASK_DESCRIPTION_PREFIX,
+    TASK_DESCRIPTION_SUFFIX,
+)
 from deepagents.state import DeepAgentState
 from langgraph.prebuilt import create_react_agent
-from langchain_core.tools import BaseTool
-from typing import TypedDict, List, Optional, Callable
+from langchain_core.tools import BaseTool, StructuredTool
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Callable
+from typing_extensions import TypedDict
+import asyncio
+import inspect
+import sys
 from langchain_core.tools import tool, InjectedToolCallId
-from langchain_core.messages import ToolMessage
+from langchain_core.messages import AIMessage, ToolMessage
 from typing import Annotated, NotRequired
+from langgraph.config import get_stream_writer
 from langgraph.types import Command
 
 from langgraph.prebuilt import InjectedState
@@ -18,25 +28,130 @@ class SubAgent(TypedDict):
     tools: NotRequired[list[str]]
 
 
-def _create_task_tool(
+class SubAgentFork(TypedDict):
+    """One fork of a `spawn_agents` call."""
+
+    subagent_type: str
+    description: str
+
+
+def _supports_prompt_cache(model) -> bool:
+    """Whether the model accepts Anthropic `cache_control` content blocks.
+
+    Checked without importing langchain_anthropic: a model cannot be a
+    ChatAnthropic unless that module was already imported.
+    """
+    module = sys.modules.get("langchain_anthropic")
+    return module is not None and isinstance(model, module.ChatAnthropic)
+
+
+def _file_text(file_data: Any) -> Any:
+    """Content of a file entry in either the string or VirtualFile format."""
+    if isinstance(file_data, dict):
+        return file_data.get("content")
+    return file_data
+
+
+def _notify_human(callback: Callable, event: str, message: str) -> None:
+    """Call a sync or async human-in-the-loop callback from a sync tool."""
+    result = callback(event, message)
+    if inspect.isawaitable(result):
+        # Sync tools run in a worker thread without an event loop
+        asyncio.run(result)
+
+
+async def _anotify_human(callback: Callable, event: str, message: str) -> None:
+    """Call a human-in-the-loop callback without blocking the event loop.
+
+    Async callbacks are awaited; sync callbacks (which may block on user
+    input) run in a worker thread so other branches keep executing.
+    """
+    if inspect.iscoroutinefunction(callback):
+        await callback(event, message)
+    else:
+        result = await asyncio.to_thread(callback, event, message)
+        if inspect.isawaitable(result):
+            await result
+
+
+def _stream_writer() -> Callable:
+    """The custom stream writer of the running graph, or a no-op outside one."""
+    try:
+        return get_stream_writer()
+    except (RuntimeError, KeyError):
+        return lambda chunk: None
+
+
+async def _astream_subagent(sub_agent, state, event: Dict[str, Any]):
+    """Run a subagent, forwarding its model output as it is produced.
+
+    Each AI message (or token chunk, for streaming models) of the subagent is
+    written to the parent graph's `custom` stream as `{**event, "content": ...}`
+    so callers streaming with `stream_mode="custom"` see subagent progress
+    before the task finishes. Returns the final subagent state.
+    """
+    writer = _stream_writer()
+    result = None
+    root = None
+    # subgraphs=True is required for message events to surface when the
+    # subagent runs nested inside the parent graph's tool node
+    async for namespace, mode, chunk in sub_agent.astream(
+        state, stream_mode=["messages", "values"], subgraphs=True
+    ):
+        if mode == "values":
+            # The first values event comes from the subagent graph itself
+            if root is None:
+                root = namespace
+            if namespace == root:
+                result = chunk
+            continue
+        message, _ = chunk
+        if isinstance(message, AIMessage) and message.content:
+            writer({**event, "content": message.content})
+    return result
+
+
+def _index_tools(tools) -> Dict[str, BaseTool]:
+    """Map tool names to tools, wrapping plain callables as tools."""
+    tool_index = {}
+    for tool_ in tools:
+        if isinstance(tool_, dict):
+            # Provider-side tools are not executed locally
+            continue
+        if not isinstance(tool_, BaseTool):
+            tool_ = tool(tool_)
+        tool_index[tool_.name] = tool_
+    return tool_index
+
+
+def _create_subagent_tools(
     tools,
     instructions,
     subagents: List[SubAgent],
     model,
     state_schema,
     human_in_the_loop: Optional[Callable] = None,
+    tool_index: Optional[Dict[str, BaseTool]] = None,
 ):
+    """Create the `task` and `spawn_agents` tools over one set of subagents.
+
+    `tool_index` maps tool names to tools; pass it when the caller already
+    built one so subagent tool lists resolve without rescanning `tools`.
+    """
     agents = {
         "general-purpose": create_react_agent(model, prompt=instructions, tools=tools)
     }
-    tools_by_name = {}
-    for tool_ in tools:
-        if not isinstance(tool_, BaseTool):
-            tool_ = tool(tool_)
-        tools_by_name[tool_.name] = tool_
+    if tool_index is None:
+        tool_index = _index_tools(tools)
     for _agent in subagents:
         if "tools" in _agent:
-            _tools = [tools_by_name[t] for t in _agent["tools"]]
+            missing = [t for t in _agent["tools"] if t not in tool_index]
+            if missing:
+                raise ValueError(
+                    f"Subagent {_agent['name']} requested unknown tools {missing}, "
+                    f"available tools are {list(tool_index)}"
+                )
+            _tools = [tool_index[t] for t in _agent["tools"]]
         else:
             _tools = tools
         agents[_agent["name"]] = create_react_agent(
@@ -47,10 +162,18 @@ def _create_task_tool(
         f"- {_agent['name']}: {_agent['description']}" for _agent in subagents
     ]
 
-    @tool(
-        description=TASK_DESCRIPTION_PREFIX.format(other_agents=other_agents_string)
-        + TASK_DESCRIPTION_SUFFIX
-    )
+    def _task_result(result, tool_call_id: str):
+        return Command(
+            update={
+                "files": result.get("files", {}),
+                "messages": [
+                    ToolMessage(
+                        result["messages"][-1].content, tool_call_id=tool_call_id
+                    )
+                ],
+            }
+        )
+
     def task(
         description: str,
         subagent_type: str,
@@ -58,23 +181,179 @@ def _create_task_tool(
         tool_call_id: Annotated[str, InjectedToolCallId],
     ):
         if human_in_the_loop:
-            human_in_the_loop("Task started", description)
+            _notify_human(human_in_the_loop, "Task started", description)
         if subagent_type not in agents:
             return f"Error: invoked agent of type {subagent_type}, the only allowed types are {[f'`{k}`' for k in agents]}"
         sub_agent = agents[subagent_type]
         state["messages"] = [{"role": "user", "content": description}]
         result = sub_agent.invoke(state)
         if human_in_the_loop:
-            human_in_the_loop("Task complete", result["messages"][-1].content)
+            _notify_human(
+                human_in_the_loop, "Task complete", result["messages"][-1].content
+            )
+        return _task_result(result, tool_call_id)
+
+    async def atask(
+        description: str,
+        subagent_type: str,
+        state: Annotated[DeepAgentState, InjectedState],
+        tool_call_id: Annotated[str, InjectedToolCallId],
+    ):
+        if human_in_the_loop:
+            await _anotify_human(human_in_the_loop, "Task started", description)
+        if subagent_type not in agents:
+            return f"Error: invoked agent of type {subagent_type}, the only allowed types are {[f'`{k}`' for k in agents]}"
+        sub_agent = agents[subagent_type]
+        state["messages"] = [{"role": "user", "content": description}]
+        result = await _astream_subagent(
+            sub_agent,
+            state,
+            {"subagent_type": subagent_type, "tool_call_id": tool_call_id},
+        )
+        if human_in_the_loop:
+            await _anotify_human(
+                human_in_the_loop, "Task complete", result["messages"][-1].content
+            )
+        return _task_result(result, tool_call_id)
+
+    task_tool = StructuredTool.from_function(
+        func=task,
+        coroutine=atask,
+        name="task",
+        description=TASK_DESCRIPTION_PREFIX.format(other_agents=other_agents_string)
+        + TASK_DESCRIPTION_SUFFIX,
+    )
+
+    prompt_cache = _supports_prompt_cache(model)
+
+    def _fork_state(state, shared_context: str, fork: SubAgentFork):
+        if prompt_cache:
+            # Shared prefix first and marked cacheable, per-fork delta after it
+            content = [
+                {
+                    "type": "text",
+                    "text": shared_context,
+                    "cache_control": {"type": "ephemeral"},
+                },
+                {"type": "text", "text": fork["description"]},
+            ]
+        else:
+            content = shared_context + "\n\n" + fork["description"]
+        return {**state, "messages": [{"role": "user", "content": content}]}
+
+    def _spawn_result(
+        forks: List[SubAgentFork], results, parent_files: Dict, tool_call_id: str
+    ):
+        # Every fork returns the whole file map it was forked with, so only
+        # the paths a fork created or changed are sent back
+        files = {}
+        changed_by: Dict[str, int] = {}
+        reports = []
+        conflicts = []
+        for i, (fork, result) in enumerate(zip(forks, results), 1):
+            if isinstance(result, str):
+                reports.append(f"## Fork {i} ({fork['subagent_type']})\n{result}")
+                continue
+            for path, file_data in result.get("files", {}).items():
+                if path in parent_files and _file_text(
+                    parent_files[path]
+                ) == _file_text(file_data):
+                    continue
+                if path in changed_by:
+                    # Keep the first fork's version and report the clash
+                    conflicts.append(
+                        f"Conflict: forks {changed_by[path]} and {i} both "
+                        f"changed {path}; kept fork {changed_by[path]}'s version"
+                    )
+                    continue
+                changed_by[path] = i
+                files[path] = file_data
+            reports.append(
+                f"## Fork {i} ({fork['subagent_type']})\n"
+                f"{result['messages'][-1].content}"
+            )
+        reports.extend(conflicts)
         return Command(
             update={
-                "files": result.get("files", {}),
+                "files": files,
                 "messages": [
-                    ToolMessage(
-                        result["messages"][-1].content, tool_call_id=tool_call_id
-                    )
+                    ToolMessage("\n\n".join(reports), tool_call_id=tool_call_id)
                 ],
             }
         )
 
-    return task
+    def _check_fork(fork: SubAgentFork) -> Optional[str]:
+        if fork["subagent_type"] not in agents:
+            return f"Error: invoked agent of type {fork['subagent_type']}, the only allowed types are {[f'`{k}`' for k in agents]}"
+        return None
+
+    def _run_fork(state, shared_context: str, fork: SubAgentFork):
+        error = _check_fork(fork)
+        if error:
+            return error
+        if human_in_the_loop:
+            _notify_human(human_in_the_loop, "Task started", fork["description"])
+        result = agents[fork["subagent_type"]].invoke(
+            _fork_state(state, shared_context, fork)
+        )
+        if human_in_the_loop:
+            _notify_human(
+                human_in_the_loop, "Task complete", result["messages"][-1].content
+            )
+        return result
+
+    async def _arun_fork(
+        state, shared_context: str, fork: SubAgentFork, tool_call_id: str
+    ):
+        error = _check_fork(fork)
+        if error:
+            return error
+        if human_in_the_loop:
+            await _anotify_human(
+                human_in_the_loop, "Task started", fork["description"]
+            )
+        result = await _astream_subagent(
+            agents[fork["subagent_type"]],
+            _fork_state(state, shared_context, fork),
+            {**fork, "tool_call_id": tool_call_id},
+        )
+        if human_in_the_loop:
+            await _anotify_human(
+                human_in_the_loop, "Task complete", result["messages"][-1].content
+            )
+        return result
+
+    def spawn_agents(
+        shared_context: str,
+        forks: List[SubAgentFork],
+        state: Annotated[DeepAgentState, InjectedState],
+        tool_call_id: Annotated[str, InjectedToolCallId],
+    ):
+        with ThreadPoolExecutor(max_workers=max(len(forks), 1)) as pool:
+            results = list(
+                pool.map(lambda fork: _run_fork(state, shared_context, fork), forks)
+            )
+        return _spawn_result(forks, results, state.get("files", {}), tool_call_id)
+
+    async def aspawn_agents(
+        shared_context: str,
+        forks: List[SubAgentFork],
+        state: Annotated[DeepAgentState, InjectedState],
+        tool_call_id: Annotated[str, InjectedToolCallId],
+    ):
+        results = await asyncio.gather(
+            *[
+                _arun_fork(state, shared_context, fork, tool_call_id)
+                for fork in forks
+            ]
+        )
+        return _spawn_result(forks, results, state.get("files", {}), tool_call_id)
+
+    spawn_tool = StructuredTool.from_function(
+        func=spawn_agents,
+        coroutine=aspawn_agents,
+        name="spawn_agents",
+        description=SPAWN_AGENTS_DESCRIPTION,
+    )
+
+    return [task_tool, spawn_tool]
@@ -9,7 +9,7 @@ from deepagents.prompts import (
     EDIT_DESCRIPTION,
     TOOL_DESCRIPTION,
 )
-from deepagents.state import Todo, DeepAgentState
+from deepagents.state import Todo, DeepAgentState, _intern_todo
 
 
 def benchmark_tool_call(func: Callable) -> Callable:
@@ -34,6 +34,7 @@ def benchmark_tool_call(func: Callable) -> Callable:
 def write_todos(
     todos: list[Todo], tool_call_id: Annotated[str, InjectedToolCallId]
 ) -> Command:
+    todos = [_intern_todo(todo) for todo in todos]
     return Command(
         update={
             "todos": todos,
@@ -110,11 +111,10 @@ def write_file(
     tool_call_id: Annotated[str, InjectedToolCallId],
 ) -> Command:
     """Write content to a file in the virtual filesystem."""
-    files = state.get("files", {})
-    files[file_path] = content
+    # Only the written file is returned; file_reducer merges it into the rest
     return Command(
         update={
-            "files": files,
+            "files": {file_path: content},
             "messages": [
                 ToolMessage(f"Updated file {file_path}", tool_call_id=tool_call_id)
             ],
@@ -169,11 +169,10 @@ def edit_file(
         )  # Replace only first occurrence
         result_msg = f"Successfully replaced string in '{file_path}'"
 
-    # Update the mock filesystem
-    mock_filesystem[file_path] = new_content
+    # Return only the edited file; file_reducer merges it into the rest
     return Command(
         update={
-            "files": mock_filesystem,
+            "files": {file_path: new_content},
             "messages": [
                 ToolMessage(f"Updated file {file_path}", tool_call_id=tool_call_id)
             ],
@@ -0,0 +1,115 @@
+"""Unit tests for the compiler module."""
+
+import asyncio
+import itertools
+import json
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from deepagents.compiler import _parse_plan, _resolve_args, create_compiler_agent
+
+
+class FakePlannerModel(GenericFakeChatModel):
+    """Fake chat model that ignores tool binding."""
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+in_flight = []
+peak_in_flight = []
+
+
+@tool
+async def slow_echo(text: str) -> str:
+    """Echo text after a short delay."""
+    in_flight.append(text)
+    peak_in_flight.append(len(in_flight))
+    await asyncio.sleep(0.05)
+    in_flight.remove(text)
+    return f"echo:{text}"
+
+
+@pytest.mark.unit
+def test_parse_plan():
+    """Test parsing planner output into normalized steps."""
+    text = 'Plan:\n```json\n{"steps": [{"id": 1, "tool": "a", "args": {"x": 1}}, {"id": 2, "tool": "b", "depends_on": [1]}]}\n```'
+    plan = _parse_plan(text)
+
+    assert [step["id"] for step in plan] == ["1", "2"]
+    assert plan[1]["depends_on"] == ["1"]
+    assert plan[1]["args"] == {}
+    assert plan[0]["call_id"] != plan[1]["call_id"]
+
+
+@pytest.mark.unit
+def test_parse_plan_malformed():
+    """Test malformed planner output yields an empty plan."""
+    assert _parse_plan("no json here") == []
+    assert _parse_plan("{not json}") == []
+    assert _parse_plan('{"steps": null}') == []
+    assert _parse_plan('{"steps": "read the file"}') == []
+
+
+@pytest.mark.unit
+def test_resolve_args():
+    """Test templating earlier step outputs into args."""
+    results = {"1": {"lines": 3}, "2": "ok"}
+    args = {"whole": "${1}", "text": "status ${2}, missing ${9}", "items": ["${2}"]}
+
+    assert _resolve_args(args, results) == {
+        "whole": {"lines": 3},
+        "text": "status ok, missing ${9}",
+        "items": ["ok"],
+    }
+
+
+@pytest.mark.unit
+def test_compiler_agent_runs_independent_steps_concurrently():
+    """Test independent plan steps are dispatched in the same batch."""
+    plan = {
+        "steps": [
+            {"id": "a", "tool": "slow_echo", "args": {"text": "x"}},
+            {"id": "b", "tool": "slow_echo", "args": {"text": "y"}},
+            {"id": "c", "tool": "slow_echo", "args": {"text": "${a}+${b}"}, "depends_on": ["a", "b"]},
+        ]
+    }
+    model = FakePlannerModel(
+        messages=iter([AIMessage(content=json.dumps(plan)), AIMessage(content="done")])
+    )
+    agent = create_compiler_agent(model, prompt="Test agent", tools=[slow_echo])
+
+    peak_in_flight.clear()
+    result = asyncio.run(agent.ainvoke({"messages": [{"role": "user", "content": "go"}]}))
+
+    assert result["step_results"]["c"] == "echo:echo:x+echo:y"
+    assert result["messages"][-1].content == "done"
+    # a and b ran together in the first wave, then c alone
+    assert peak_in_flight == [1, 2, 1]
+
+
+@pytest.mark.unit
+def test_compiler_agent_joiner_stops_before_recursion_limit():
+    """Test a joiner that keeps calling tools ends with a reply, not an error."""
+    for limit in range(4, 12):
+        tool_calls = (
+            AIMessage(
+                content="",
+                tool_calls=[{"name": "slow_echo", "args": {"text": "x"}, "id": f"call_{i}"}],
+            )
+            for i in itertools.count()
+        )
+        model = FakePlannerModel(
+            messages=itertools.chain([AIMessage(content='{"steps": []}')], tool_calls)
+        )
+        agent = create_compiler_agent(model, prompt="Test agent", tools=[slow_echo])
+        result = asyncio.run(
+            agent.ainvoke(
+                {"messages": [{"role": "user", "content": "go"}]},
+                {"recursion_limit": limit},
+            )
+        )
+        assert result["messages"][-1].content == (
+            "Sorry, need more steps to process this request."
+        )
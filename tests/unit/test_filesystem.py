@@ -0,0 +1,262 @@
+"""Unit tests for the filesystem module."""
+
+import asyncio
+from datetime import datetime
+import pytest
+from langchain_core.messages import AIMessage
+from langgraph.graph import START, StateGraph
+from langgraph.prebuilt import ToolNode
+from deepagents.state import DeepAgentState, file_reducer, virtual_fs_reducer
+from deepagents.filesystem import (
+    mkdir, cd, pwd, ls_enhanced, cp, file_history, human_input,
+    pending_human_inputs, resolve_human,
+)
+
+
+def _state(**values):
+    """Build a minimal agent state for tool invocation."""
+    return {"messages": [], "is_last_step": False, "remaining_steps": 10, **values}
+
+
+def _call(tool_, state, **args):
+    """Invoke a filesystem tool the way the agent's ToolNode would."""
+    return tool_.invoke(
+        {
+            "type": "tool_call",
+            "id": "call_1",
+            "name": tool_.name,
+            "args": {**args, "state": state},
+        }
+    )
+
+
+def _apply(state, command):
+    """Merge a Command update into the state through the state reducers."""
+    reducers = {"virtual_fs": virtual_fs_reducer, "files": file_reducer}
+    for key, value in command.update.items():
+        if key in reducers:
+            state[key] = reducers[key](state.get(key), value)
+        elif key != "messages":
+            state[key] = value
+    return command.update["messages"][-1].content
+
+
+@pytest.mark.unit
+def test_mkdir_creates_parents():
+    """Test mkdir registers missing parent directories."""
+    state = _state(virtual_fs={"files": {}, "directories": [], "current_directory": "/"})
+    _apply(state, _call(mkdir, state, path="/a/b/c"))
+
+    assert sorted(state["virtual_fs"]["directories"]) == ["/a", "/a/b", "/a/b/c"]
+    assert "already exists" in _apply(state, _call(mkdir, state, path="/a/b"))
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("indexed", [True, False])
+def test_parallel_updates_from_same_state_compose(indexed):
+    """Test filesystem updates computed from the same state all survive the merge."""
+    vfs = {"files": {}, "directories": [], "current_directory": "/"}
+    if indexed:
+        vfs["children"] = {}
+    state = _state(virtual_fs=vfs, files={"/a.txt": "abc"})
+    commands = [
+        _call(mkdir, state, path="/src"),
+        _call(mkdir, state, path="/docs"),
+        _call(cp, state, source="/a.txt", destination="/b.txt"),
+    ]
+    for command in commands:
+        _apply(state, command)
+
+    assert ls_enhanced.invoke({"state": state}).splitlines() == [
+        "d rwxr-xr-x  docs/",
+        "d rwxr-xr-x  src/",
+        "- rw-r--r--         3  b.txt",
+    ]
+    assert _apply(state, _call(cd, state, path="/src")) == "Changed directory to /src"
+
+
+@pytest.mark.unit
+def test_tools_default_to_empty_filesystem():
+    """Test tools work on a state that has no virtual filesystem yet."""
+    state = _state()
+
+    assert pwd.invoke({"state": state}) == "/"
+    assert ls_enhanced.invoke({"state": state}) == "Directory / is empty"
+    assert file_history.invoke({"file_path": "a.py", "state": state}) == (
+        "File /a.py not found"
+    )
+    _apply(state, _call(mkdir, state, path="/a"))
+    assert state["virtual_fs"]["directories"] == ["/a"]
+
+
+@pytest.mark.unit
+def test_cd_requires_existing_directory():
+    """Test cd only changes into known directories."""
+    state = _state(virtual_fs={"files": {}, "directories": [], "current_directory": "/"})
+    _apply(state, _call(mkdir, state, path="src"))
+
+    assert "does not exist" in _apply(state, _call(cd, state, path="missing"))
+    _apply(state, _call(cd, state, path="src"))
+    assert state["virtual_fs"]["current_directory"] == "/src"
+
+
+@pytest.mark.unit
+def test_ls_enhanced_lists_direct_children_only():
+    """Test ls_enhanced shows directories then files of one directory."""
+    state = _state(virtual_fs={"files": {}, "directories": [], "current_directory": "/"})
+    _apply(state, _call(mkdir, state, path="/src/pkg"))
+    _apply(state, _call(mkdir, state, path="/docs"))
+    state["files"] = {"/src/main.py": "print('hi')"}
+    _apply(state, _call(cp, state, source="/src/main.py", destination="/src/copy.py"))
+
+    listing = ls_enhanced.invoke({"state": state, "path": "/src"})
+    assert listing.splitlines() == [
+        "d rwxr-xr-x  pkg/",
+        "- rw-r--r--        11  copy.py",
+    ]
+    assert ls_enhanced.invoke({"state": state, "path": "/"}).splitlines() == [
+        "d rwxr-xr-x  docs/",
+        "d rwxr-xr-x  src/",
+    ]
+
+
+@pytest.mark.unit
+def test_ls_enhanced_indexes_existing_state():
+    """Test ls_enhanced works on states created without the children index."""
+    state = _state(
+        virtual_fs={
+            "files": {
+                "/a/x.txt": {
+                    "content": "abc",
+                    "metadata": {
+                        "created_at": "2025-01-01T00:00:00",
+                        "modified_at": "2025-01-01T00:00:00",
+                        "size": 3,
+                        "permissions": "rw-r--r--",
+                        "version": 1,
+                    },
+                }
+            },
+            "directories": ["/a", "/a/b"],
+            "current_directory": "/a",
+        }
+    )
+    assert ls_enhanced.invoke({"state": state}).splitlines() == [
+        "d rwxr-xr-x  b/",
+        "- rw-r--r--         3  x.txt",
+    ]
+
+
+@pytest.mark.unit
+def test_cp_stores_content_once():
+    """Test copies of the same content share one blob."""
+    state = _state(
+        virtual_fs={"files": {}, "directories": [], "current_directory": "/"},
+        files={"/a.txt": "shared content"},
+    )
+    _apply(state, _call(cp, state, source="/a.txt", destination="/b.txt"))
+    _apply(state, _call(cp, state, source="/b.txt", destination="/c.txt"))
+
+    vfs = state["virtual_fs"]
+    assert len(vfs["blobs"]) == 1
+    assert vfs["files"]["/b.txt"]["content_ref"] == vfs["files"]["/c.txt"]["content_ref"]
+    assert state["files"]["/c.txt"]["content"] == "shared content"
+    assert "Size: 14 bytes" in file_history.invoke({"state": state, "file_path": "/c.txt"})
+
+
+@pytest.mark.unit
+def test_cp_overwrite_drops_unreferenced_blob():
+    """Test overwriting a copy releases its old blob once nothing references it."""
+    state = _state(
+        virtual_fs={"files": {}, "directories": [], "current_directory": "/"},
+        files={"/a.txt": "old", "/new.txt": "new"},
+    )
+    _apply(state, _call(cp, state, source="/a.txt", destination="/b.txt"))
+    _apply(state, _call(cp, state, source="/a.txt", destination="/c.txt"))
+    old_ref = state["virtual_fs"]["files"]["/b.txt"]["content_ref"]
+
+    # /c.txt still references the old content
+    _apply(state, _call(cp, state, source="/new.txt", destination="/b.txt"))
+    assert old_ref in state["virtual_fs"]["blobs"]
+
+    _apply(state, _call(cp, state, source="/new.txt", destination="/c.txt"))
+    vfs = state["virtual_fs"]
+    assert list(vfs["blobs"].values()) == ["new"]
+    assert "Size: 3 bytes" in file_history.invoke({"state": state, "file_path": "/c.txt"})
+
+
+def _human_call(prompt):
+    return {
+        "type": "tool_call",
+        "id": "call_human",
+        "name": "human_input",
+        "args": {"prompt": prompt, "state": _state()},
+    }
+
+
+@pytest.mark.unit
+def test_human_input_without_wait_returns_placeholder():
+    """Test human_input does not block when no wait is configured."""
+    command = asyncio.run(human_input.ainvoke(_human_call("Approve?")))
+
+    assert command.update["messages"][0].content == "Human input requested: Approve?"
+    assert command.update["human_feedback"][0]["response"] is None
+    assert human_input.invoke(_human_call("Approve?")).update["messages"][0].content == (
+        "Human input requested: Approve?"
+    )
+
+
+@pytest.mark.unit
+def test_human_input_waits_for_resolve_human():
+    """Test a waiting human_input resumes when resolved."""
+    async def run():
+        config = {"configurable": {"human_input_timeout": 5}}
+        pending = asyncio.create_task(human_input.ainvoke(_human_call("Approve?"), config))
+        while "call_human" not in pending_human_inputs():
+            await asyncio.sleep(0)
+        assert resolve_human("call_human", "yes")
+        return await pending
+
+    command = asyncio.run(run())
+    assert command.update["messages"][0].content == "Human response: yes"
+    assert command.update["human_feedback"][0]["response"] == "yes"
+    assert not resolve_human("call_human", "again")
+
+
+@pytest.mark.unit
+def test_parallel_human_inputs_append_feedback():
+    """Test several human_input calls in one step each append their feedback."""
+    builder = StateGraph(DeepAgentState)
+    builder.add_node("tools", ToolNode([human_input]))
+    builder.add_edge(START, "tools")
+    graph = builder.compile()
+    calls = [
+        {"name": "human_input", "args": {"prompt": prompt}, "id": f"call_{prompt}"}
+        for prompt in ("Approve?", "Deploy?")
+    ]
+    state = {
+        "messages": [AIMessage(content="", tool_calls=calls)],
+        "human_feedback": [{"prompt": "Earlier?", "response": "no"}],
+    }
+
+    result = asyncio.run(graph.ainvoke(state))
+
+    assert [entry["prompt"] for entry in result["human_feedback"]] == [
+        "Earlier?", "Approve?", "Deploy?"
+    ]
+
+
+@pytest.mark.unit
+def test_cp_records_integer_timestamps():
+    """Test cp stores nanosecond timestamps and file_history formats them."""
+    state = _state(
+        virtual_fs={"files": {}, "directories": [], "current_directory": "/"},
+        files={"/a.txt": "abc"},
+    )
+    _apply(state, _call(cp, state, source="/a.txt", destination="/b.txt"))
+
+    metadata = state["virtual_fs"]["files"]["/b.txt"]["metadata"]
+    assert isinstance(metadata["modified_at_ns"], int)
+    expected = datetime.fromtimestamp(metadata["modified_at_ns"] / 1e9).isoformat()
+    history = file_history.invoke({"state": state, "file_path": "/b.txt"})
+    assert f"Modified: {expected}" in history
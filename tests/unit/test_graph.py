@@ -1,7 +1,8 @@
 """Unit tests for the graph module."""
 
+import asyncio
 import pytest
-from deepagents import create_deep_agent
+from deepagents import create_deep_agent, run_batch_async
 from deepagents.state import DeepAgentState
 from deepagents.sub_agent import SubAgent
 
@@ -69,3 +70,116 @@ def test_create_deep_agent_without_default_prompt():
         use_default_prompt=False
     )
     assert agent is not None
+
+
+@pytest.mark.unit
+def test_run_batch_async_preserves_order_and_limits_concurrency():
+    """Test concurrent batch execution of agent runs."""
+    class FakeAgent:
+        def __init__(self):
+            self.active = 0
+            self.peak = 0
+
+        async def ainvoke(self, task):
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            await asyncio.sleep(0.01)
+            self.active -= 1
+            return {"messages": [task["messages"][0]["content"]]}
+
+    agent = FakeAgent()
+    tasks = [{"messages": [{"role": "user", "content": str(i)}]} for i in range(5)]
+    results = asyncio.run(run_batch_async(agent, tasks, max_concurrency=2))
+
+    assert [r["messages"][0] for r in results] == ["0", "1", "2", "3", "4"]
+    assert agent.peak == 2
+
+
+@pytest.mark.unit
+def test_create_deep_agent_compiler_mode():
+    """Test creation with the compiler planner."""
+    agent = create_deep_agent(
+        tools=[],
+        instructions="Planner agent",
+        planner_mode="compiler"
+    )
+    assert set(agent.get_graph().nodes) >= {"planner", "scheduler", "tools", "joiner"}
+
+
+@pytest.mark.unit
+def test_create_deep_agent_invalid_planner_mode():
+    """Test an unknown planner mode is rejected."""
+    with pytest.raises(ValueError):
+        create_deep_agent(tools=[], instructions="Test", planner_mode="unknown")
+
+
+@pytest.mark.unit
+def test_create_deep_agent_with_llm_cache():
+    """Test responses are served from the cache for identical requests."""
+    from deepagents.model import PromptHashCache
+    from langchain_core.language_models import BaseChatModel
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+
+    calls = []
+
+    class CountingModel(BaseChatModel):
+        @property
+        def _llm_type(self):
+            return "counting"
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            calls.append(messages)
+            message = AIMessage(content=f"response {len(calls)}")
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+        def bind_tools(self, tools, **kwargs):
+            return self
+
+    cache = PromptHashCache()
+    model = CountingModel()
+    agent = create_deep_agent(
+        tools=[],
+        instructions="Cached agent",
+        model=model,
+        llm_cache=cache
+    )
+    task = {"messages": [{"role": "user", "content": "hello"}]}
+
+    assert agent.invoke(task)["messages"][-1].content == "response 1"
+    assert agent.invoke(task)["messages"][-1].content == "response 1"
+    assert len(calls) == 1
+
+
+@pytest.mark.unit
+def test_create_deep_agent_speculative():
+    """Test creation with speculative tool execution."""
+    agent = create_deep_agent(
+        tools=[],
+        instructions="Speculative agent",
+        speculative=True
+    )
+    assert set(agent.get_graph().nodes) >= {"agent", "tools"}
+
+
+@pytest.mark.unit
+def test_render_prompt():
+    """Test prompt rendering for each configuration."""
+    from deepagents.graph import DEFAULT_BASE_PROMPT, _render_prompt
+
+    assert _render_prompt("Base", "Custom", True) == "Custom"
+    assert _render_prompt("Base", None, False) == "Base"
+    assert _render_prompt("Base", None, True) == DEFAULT_BASE_PROMPT + "\n\nBase"
+    assert _render_prompt("Base", None, True) is _render_prompt("Base", None, True)
+
+
+@pytest.mark.unit
+def test_render_prompt_caches_base_prompt_first():
+    """Test the Anthropic prompt caches the static base prompt on its own."""
+    from deepagents.graph import DEFAULT_BASE_PROMPT, _render_prompt
+
+    static, instructions = _render_prompt("Base", None, True, True).content
+    assert static["text"] == DEFAULT_BASE_PROMPT
+    assert static["cache_control"] == {"type": "ephemeral"}
+    assert instructions == {"type": "text", "text": "Base"}
+    assert _render_prompt("Base", "Custom", True, True) == "Custom"
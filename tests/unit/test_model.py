@@ -0,0 +1,244 @@
+"""Unit tests for the model module."""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult, Generation
+from deepagents import model
+from langchain_core.globals import get_llm_cache, set_llm_cache
+from deepagents.model import (
+    BatchedModel, PromptHashCache, SQLitePromptCache, get_cerebras_model,
+    get_default_model, get_model, setup_llm_cache,
+)
+
+
+def _prompt(message_id):
+    return json.dumps(
+        [{"lc": 1, "kwargs": {"content": "hi", "type": "human", "id": message_id}}]
+    )
+
+
+@pytest.mark.unit
+def test_prompt_hash_cache_ignores_message_ids(monkeypatch):
+    """Test cache keys ignore message ids, with and without orjson."""
+    for backend in (model.orjson, None):
+        monkeypatch.setattr(model, "orjson", backend)
+        cache = PromptHashCache()
+        cache.update(_prompt("a"), "llm", [Generation(text="cached")])
+
+        assert cache.lookup(_prompt("b"), "llm")[0].text == "cached"
+        assert cache.lookup(_prompt("b"), "other llm") is None
+        assert cache.lookup("not json", "llm") is None
+
+
+@pytest.mark.unit
+def test_prompt_hash_cache_evicts_safely_across_threads():
+    """Test concurrent updates at capacity never evict the same key twice."""
+    cache = PromptHashCache(maxsize=4)
+    errors = []
+
+    def fill(worker):
+        try:
+            for i in range(500):
+                cache.update(_prompt(None), f"llm-{worker}-{i}", [])
+        except Exception as exc:  # pragma: no cover - failure path
+            errors.append(exc)
+
+    threads = [threading.Thread(target=fill, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(cache._cache) == 4
+
+
+@pytest.mark.unit
+def test_prompt_hash_cache_key_independent_of_backend(monkeypatch):
+    """Test orjson and stdlib json produce the same cache key."""
+    pytest.importorskip("orjson")
+    prompt = json.dumps(
+        [{"lc": 1, "kwargs": {"content": "héllo ✓", "type": "human", "n": 2.5}}]
+    )
+    with_orjson = PromptHashCache._key(prompt, '{"model": "m"}')
+    monkeypatch.setattr(model, "orjson", None)
+    assert PromptHashCache._key(prompt, '{"model": "m"}') == with_orjson
+
+
+@pytest.mark.unit
+def test_get_model_reuses_clients():
+    """Test factories return one client per configuration."""
+    assert get_model("cerebras") is get_model("cerebras")
+    assert get_model("cerebras", temperature=0) is not get_model("cerebras")
+    assert get_cerebras_model() is get_cerebras_model()
+    # Unhashable arguments bypass the cache
+    stop = ["END"]
+    assert get_model("cerebras", stop=stop) is not get_model("cerebras", stop=stop)
+    with pytest.raises(ValueError, match="Unsupported provider"):
+        get_model("other")
+
+
+@pytest.mark.unit
+def test_claude_prompt_cache_header():
+    """Test Claude models opt into prompt caching unless disabled."""
+    cached = get_model("claude")
+    uncached = get_model("claude", enable_prompt_cache=False)
+
+    assert cached.default_headers["anthropic-beta"] == "prompt-caching-2024-07-31"
+    assert not uncached.default_headers
+    assert get_model("claude") is cached
+
+
+@pytest.mark.unit
+def test_llm_cache_from_environment(monkeypatch):
+    """Test DEEPAGENTS_LLM_CACHE installs the global cache on first model use."""
+    monkeypatch.setenv("DEEPAGENTS_LLM_CACHE", "1")
+    model._auto_llm_cache.cache_clear()
+    try:
+        get_model("cerebras")
+        cache = get_llm_cache()
+        assert isinstance(cache, PromptHashCache)
+        get_model("cerebras")
+        assert get_llm_cache() is cache
+        with pytest.raises(ValueError, match="Unsupported cache backend"):
+            setup_llm_cache("redis")
+    finally:
+        set_llm_cache(None)
+        model._auto_llm_cache.cache_clear()
+
+
+@pytest.mark.unit
+def test_provider_imports_are_lazy():
+    """Test provider packages are imported only when their model is built."""
+    code = (
+        "import sys, deepagents.model; "
+        "print('langchain_anthropic' in sys.modules, "
+        "'langchain_cerebras' in sys.modules); "
+        "from deepagents import create_deep_agent; "
+        "create_deep_agent([], 'Be helpful.'); "
+        "print('langchain_anthropic' in sys.modules)"
+    )
+    env = {**os.environ, "CEREBRAS_API_KEY": "x", "DEEPAGENTS_SKIP_DOTENV": "1"}
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True, text=True, check=True, env=env,
+    ).stdout
+    assert output.split() == ["False", "False", "False"]
+
+
+@pytest.mark.unit
+def test_dotenv_loaded_once(monkeypatch):
+    """Test .env is read on first model use only, unless skipped."""
+    calls = []
+    monkeypatch.setattr(model, "load_dotenv", lambda: calls.append(1))
+    model._ensure_env.cache_clear()
+    try:
+        get_model("cerebras")
+        get_model("cerebras", temperature=0.5)
+        assert calls == [1]
+
+        model._ensure_env.cache_clear()
+        monkeypatch.setenv("DEEPAGENTS_SKIP_DOTENV", "1")
+        get_model("cerebras")
+        assert calls == [1]
+    finally:
+        model._ensure_env.cache_clear()
+
+
+class SlowEchoModel(BaseChatModel):
+    """Fake chat model that records how many calls run at once."""
+
+    active: int = 0
+    peak: int = 0
+
+    @property
+    def _llm_type(self):
+        return "slow-echo"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        message = AIMessage(content=messages[-1].content.upper())
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return self._generate(messages)
+
+
+@pytest.mark.unit
+def test_batched_model():
+    """Test batch entry points keep order and bound concurrency."""
+    llm = SlowEchoModel()
+    batched = BatchedModel(llm, max_concurrency=2)
+    prompts = ["a", "b", "c", "d", "e"]
+
+    results = asyncio.run(batched.abatch(prompts))
+    assert [r.content for r in results] == ["A", "B", "C", "D", "E"]
+    assert llm.peak == 2
+    assert [r.content for r in batched.batch(prompts)] == ["A", "B", "C", "D", "E"]
+    assert batched.invoke("x").content == "X"
+    assert isinstance(get_model("cerebras", batched=True).llm, BaseChatModel)
+
+
+@pytest.mark.unit
+def test_sqlite_prompt_cache_persists(tmp_path, monkeypatch):
+    """Test the SQLite cache is shared across instances and enabled by env."""
+    path = str(tmp_path / "cache" / "llm.sqlite")
+    generation = ChatGeneration(message=AIMessage(content="cached"))
+    SQLitePromptCache(path).update(_prompt("a"), "llm", [generation])
+
+    cache = SQLitePromptCache(path)
+    assert cache.lookup(_prompt("b"), "llm")[0].message.content == "cached"
+    assert cache.lookup(_prompt("b"), "other llm") is None
+    journal = cache._conn.execute("PRAGMA journal_mode").fetchone()[0]
+    assert journal == "wal"
+    cache.clear()
+    assert cache.lookup(_prompt("a"), "llm") is None
+
+    monkeypatch.setenv("DEEPAGENTS_CACHE_DB", path)
+    model._auto_llm_cache.cache_clear()
+    try:
+        get_model("cerebras")
+        assert isinstance(get_llm_cache(), SQLitePromptCache)
+    finally:
+        set_llm_cache(None)
+        model._auto_llm_cache.cache_clear()
+
+
+@pytest.mark.unit
+def test_default_model_built_once_across_threads(monkeypatch):
+    """Test concurrent first calls share one default model instance."""
+    built = []
+
+    def slow_builder(**kwargs):
+        time.sleep(0.01)
+        built.append(kwargs)
+        return object()
+
+    monkeypatch.setattr(model, "_chat_anthropic", lambda: slow_builder)
+    model._default_model_instance.cache_clear()
+    results = []
+    try:
+        threads = [
+            threading.Thread(target=lambda: results.append(get_default_model()))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        model._default_model_instance.cache_clear()
+
+    assert len(built) == 1
+    assert len(results) == 8 and all(r is results[0] for r in results)
@@ -0,0 +1,110 @@
+"""Unit tests for the speculative module."""
+
+import asyncio
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, ToolMessage
+from langchain_core.outputs import ChatGenerationChunk
+from langchain_core.tools import tool
+from deepagents.speculative import _completed_tool_calls, create_speculative_agent
+
+calls = []
+events = []
+
+
+@tool
+async def slow_lookup(key: str) -> str:
+    """Look up a key slowly."""
+    calls.append(key)
+    events.append("tool start")
+    await asyncio.sleep(0.05)
+    return f"value of {key}"
+
+
+class StreamingToolModel(BaseChatModel):
+    """Fake model that streams one tool call, then a trailing delay, then answers."""
+
+    fail: bool = False
+
+    @property
+    def _llm_type(self):
+        return "streaming-tool"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        if isinstance(messages[-1], ToolMessage):
+            yield ChatGenerationChunk(message=AIMessageChunk(content="done"))
+            return
+        for name, args, call_id in [("slow_lookup", '{"key"', "call_1"), (None, ': "a"}', None)]:
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        {"name": name, "args": args, "id": call_id, "index": 0}
+                    ],
+                )
+            )
+        # The model keeps decoding after the tool call is complete
+        await asyncio.sleep(0.05)
+        events.append("stream end")
+        if self.fail:
+            raise RuntimeError("stream broke")
+        yield ChatGenerationChunk(message=AIMessageChunk(content=""))
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+@pytest.mark.unit
+def test_completed_tool_calls_requires_full_json():
+    """Test only tool calls with complete JSON args are reported."""
+    partial = AIMessageChunk(
+        content="",
+        tool_call_chunks=[{"name": "t", "args": '{"a": 1', "id": "1", "index": 0}],
+    )
+    complete = partial + AIMessageChunk(
+        content="", tool_call_chunks=[{"name": None, "args": "}", "id": None, "index": 0}]
+    )
+
+    assert _completed_tool_calls(partial) == []
+    assert _completed_tool_calls(complete)[0]["args"] == {"a": 1}
+    # Only the requested call indices are parsed
+    assert _completed_tool_calls(complete, {1}) == []
+    assert _completed_tool_calls(complete, {0})[0]["args"] == {"a": 1}
+
+
+@pytest.mark.unit
+def test_speculative_agent_overlaps_tool_with_decoding():
+    """Test a speculated tool call runs once, while the model is still streaming."""
+    calls.clear()
+    events.clear()
+    agent = create_speculative_agent(
+        StreamingToolModel(), prompt="Test agent", tools=[slow_lookup]
+    )
+
+    result = asyncio.run(agent.ainvoke({"messages": [{"role": "user", "content": "go"}]}))
+
+    assert calls == ["a"]
+    assert result["messages"][-2].content == "value of a"
+    assert result["messages"][-1].content == "done"
+    # The tool started before the model finished decoding its message
+    assert events[:2] == ["tool start", "stream end"]
+
+
+@pytest.mark.unit
+def test_speculative_agent_cancels_speculation_when_stream_fails():
+    """Test a failed model stream does not leave speculated tool calls running."""
+    calls.clear()
+    events.clear()
+    model = StreamingToolModel(fail=True)
+    agent = create_speculative_agent(model, prompt="Test agent", tools=[slow_lookup])
+    tool_node = agent.nodes["tools"].bound
+
+    async def run():
+        with pytest.raises(RuntimeError, match="stream broke"):
+            await agent.ainvoke({"messages": [{"role": "user", "content": "go"}]})
+        return dict(tool_node._speculations)
+
+    assert asyncio.run(run()) == {}
@@ -1,10 +1,12 @@
 """Unit tests for the state module."""
 
+import os
 import pytest
 from datetime import datetime
+from deepagents import _state_fast
 from deepagents.state import (
     Todo, FileMetadata, VirtualFile, VirtualFileSystem,
-    file_reducer, DeepAgentState
+    file_reducer, history_contents, iter_history, virtual_fs_reducer, DeepAgentState
 )
 
 
@@ -76,6 +78,14 @@ def test_file_reducer_with_none():
     assert result == {"test.txt": "content"}
 
 
+@pytest.mark.unit
+def test_file_reducer_noop_update_returns_left():
+    """Test empty or self updates return the current files unchanged."""
+    left = file_reducer({}, {"test.txt": "content"})
+    assert file_reducer(left, {}) is left
+    assert file_reducer(left, left) is left
+
+
 @pytest.mark.unit
 def test_file_reducer_merge_simple():
     """Test file reducer merging simple files."""
@@ -140,4 +150,109 @@ def test_file_reducer_version_history():
     assert result["test.txt"]["metadata"]["version"] == 2
     assert "history" in result["test.txt"]
     assert len(result["test.txt"]["history"]) == 1
-    assert result["test.txt"]["history"][0]["content"] == "version 1"
+    assert history_contents(result["test.txt"]) == ["version 1"]
+    assert result["test.txt"]["history"][0]["size"] == 9
+
+
+@pytest.mark.unit
+def test_file_reducer_leaves_left_untouched():
+    """Test merging does not mutate the previous state or its history."""
+    left = file_reducer({}, {"a.txt": "v1"})
+    update = {"content": "v2", "metadata": {**left["a.txt"]["metadata"]}}
+    left = file_reducer(left, {"a.txt": update})
+    snapshot = {**left["a.txt"], "history": left["a.txt"]["history"].copy()}
+
+    update = {"content": "v3", "metadata": {**left["a.txt"]["metadata"]}}
+    result = file_reducer(left, {"a.txt": update, "b.txt": "new"})
+
+    assert left["a.txt"] == snapshot
+    assert "b.txt" not in left
+    assert history_contents(result["a.txt"]) == ["v1", "v2"]
+
+
+@pytest.mark.unit
+def test_file_reducer_unchanged_write_keeps_version():
+    """Test rewriting identical content does not add a version."""
+    files = file_reducer({}, {"a.txt": "v1"})
+
+    same = {"content": "v1", "metadata": {**files["a.txt"]["metadata"]}}
+    files = file_reducer(files, {"a.txt": same})
+    assert files["a.txt"]["metadata"]["version"] == 1
+    assert "history" not in files["a.txt"]
+
+    changed = {"content": "v2", "metadata": {**files["a.txt"]["metadata"]}}
+    files = file_reducer(files, {"a.txt": changed})
+    assert files["a.txt"]["metadata"]["version"] == 2
+
+
+@pytest.mark.unit
+def test_file_reducer_interns_permissions():
+    """Test permission strings are shared across file entries."""
+    perms = "".join(["rw-", "r--", "r--"])
+    update = {"content": "x", "metadata": {"size": 1, "permissions": perms, "version": 1}}
+    result = file_reducer({}, {"a.txt": "a", "b.txt": update})
+
+    assert result["a.txt"]["metadata"]["permissions"] is (
+        result["b.txt"]["metadata"]["permissions"]
+    )
+
+
+@pytest.mark.unit
+def test_file_reducer_bulk_strings():
+    """Test an all-string update converts every entry with one timestamp."""
+    left = {"keep.txt": "kept"}
+    result = file_reducer(left, {f"{i}.txt": str(i) * i for i in range(1, 4)})
+
+    assert result["keep.txt"] == "kept"
+    assert [result[f"{i}.txt"]["metadata"]["size"] for i in range(1, 4)] == [1, 2, 3]
+    assert len({result[f"{i}.txt"]["metadata"]["created_at"] for i in range(1, 4)}) == 1
+
+
+@pytest.mark.unit
+def test_file_reducer_history_stores_deltas():
+    """Test history keeps line deltas and reconstructs every version."""
+    versions = ["".join(f"line {i}\n" for i in range(100))]
+    for i in range(12):
+        versions.append(versions[-1].replace(f"line {i}\n", f"edit {i}\n"))
+
+    files = file_reducer({}, {"a.py": versions[0]})
+    for content in versions[1:]:
+        update = {"content": content, "metadata": {**files["a.py"]["metadata"]}}
+        files = file_reducer(files, {"a.py": update})
+
+    history = files["a.py"]["history"]
+    assert len(history) == 10
+    assert history.maxlen == 10
+    assert all(len(entry["delta"]) == 1 for entry in history)
+    assert history_contents(files["a.py"]) == versions[2:12]
+    newest = next(iter_history(files["a.py"]))
+    assert newest == (history[-1], versions[11])
+
+
+@pytest.mark.unit
+def test_virtual_fs_reducer_merges_patches():
+    """Test virtual_fs_reducer applies partial filesystem updates."""
+    result = virtual_fs_reducer(None, {"directories": ["/a"], "children": {"/": ["/a"]}})
+    assert result == {
+        "files": {},
+        "directories": ["/a"],
+        "current_directory": "/",
+        "children": {"/": ["/a"]},
+    }
+
+    result = virtual_fs_reducer(
+        result, {"directories": ["/a", "/b"], "current_directory": "/b"}
+    )
+    assert result["directories"] == ["/a", "/b"]
+    assert result["current_directory"] == "/b"
+    assert virtual_fs_reducer(result, None) is result
+
+
+@pytest.mark.unit
+def test_state_fast_type_checks():
+    """Test the mypyc-compiled reducer module passes mypy."""
+    mypy_api = pytest.importorskip("mypy.api")
+    stdout, stderr, status = mypy_api.run(
+        ["--follow-imports=silent", "--cache-dir", os.devnull, _state_fast.__file__]
+    )
+    assert status == 0, stdout + stderr
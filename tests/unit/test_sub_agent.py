@@ -0,0 +1,175 @@
+"""Unit tests for the sub_agent module."""
+
+import asyncio
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langgraph.graph import START, StateGraph
+from langgraph.prebuilt import ToolNode
+from deepagents.state import DeepAgentState
+from deepagents.sub_agent import SubAgent, _create_subagent_tools
+from deepagents.tools import write_file
+
+
+class EchoModel(BaseChatModel):
+    """Fake chat model that answers with the text of the last message."""
+
+    @property
+    def _llm_type(self):
+        return "echo"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        content = messages[-1].content
+        if isinstance(content, list):
+            content = " | ".join(block["text"] for block in content)
+        message = AIMessage(content=f"echo: {content}")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+class WriterModel(BaseChatModel):
+    """Fake chat model that writes "WRITE <path> <content>" requests to files."""
+
+    @property
+    def _llm_type(self):
+        return "writer"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        last = messages[-1]
+        text = last.content if isinstance(last.content, str) else last.content[-1]["text"]
+        request = text.split("\n\n")[-1].split()
+        if isinstance(last, ToolMessage) or request[0] != "WRITE":
+            message = AIMessage(content="done")
+        else:
+            args = {"file_path": request[1], "content": request[2]}
+            message = AIMessage(
+                content="",
+                tool_calls=[{"name": "write_file", "args": args, "id": "call_w"}],
+            )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def _spawn_call(shared_context, forks, files=None):
+    state = {"messages": [], "is_last_step": False, "remaining_steps": 10}
+    if files is not None:
+        state["files"] = files
+    return {
+        "type": "tool_call",
+        "id": "call_1",
+        "name": "spawn_agents",
+        "args": {
+            "shared_context": shared_context,
+            "forks": forks,
+            "state": state,
+        },
+    }
+
+
+@pytest.mark.unit
+def test_spawn_agents_runs_every_fork():
+    """Test spawn_agents reports each fork with the shared context prepended."""
+    reviewer = SubAgent(name="reviewer", description="Reviews code", prompt="Review")
+    task_tool, spawn_tool = _create_subagent_tools(
+        [], "Instructions", [reviewer], EchoModel(), DeepAgentState
+    )
+    forks = [
+        {"subagent_type": "reviewer", "description": "review it"},
+        {"subagent_type": "general-purpose", "description": "test it"},
+        {"subagent_type": "missing", "description": "nothing"},
+    ]
+
+    for command in (
+        spawn_tool.invoke(_spawn_call("CODE", forks)),
+        asyncio.run(spawn_tool.ainvoke(_spawn_call("CODE", forks))),
+    ):
+        report = command.update["messages"][0].content
+        assert "## Fork 1 (reviewer)\necho: CODE\n\nreview it" in report
+        assert "## Fork 2 (general-purpose)\necho: CODE\n\ntest it" in report
+        assert "## Fork 3 (missing)\nError: invoked agent of type missing" in report
+    assert task_tool.name == "task"
+
+
+@pytest.mark.unit
+def test_spawn_agents_returns_only_changed_files():
+    """Test an idle fork's copy of a file does not undo another fork's edit."""
+    coder = SubAgent(name="coder", description="Writes code", prompt="Code")
+    _, spawn_tool = _create_subagent_tools(
+        [write_file], "Instructions", [coder], WriterModel(), DeepAgentState
+    )
+    files = {"/a.py": "orig", "/b.py": "keep"}
+    forks = [
+        {"subagent_type": "coder", "description": "WRITE /a.py edited"},
+        {"subagent_type": "coder", "description": "nothing to do"},
+    ]
+
+    for command in (
+        spawn_tool.invoke(_spawn_call("CODE", forks, files)),
+        asyncio.run(spawn_tool.ainvoke(_spawn_call("CODE", forks, files))),
+    ):
+        update = command.update["files"]
+        assert list(update) == ["/a.py"]
+        assert update["/a.py"]["content"] == "edited"
+        assert "Conflict" not in command.update["messages"][0].content
+
+    clashing = [
+        {"subagent_type": "coder", "description": "WRITE /a.py first"},
+        {"subagent_type": "coder", "description": "WRITE /a.py second"},
+    ]
+    command = spawn_tool.invoke(_spawn_call("CODE", clashing, files))
+    assert command.update["files"]["/a.py"]["content"] == "first"
+    assert "Conflict: forks 1 and 2 both changed /a.py" in (
+        command.update["messages"][0].content
+    )
+
+
+@pytest.mark.unit
+def test_unknown_subagent_tool_fails_fast():
+    """Test a subagent naming a missing tool is rejected at construction."""
+    reviewer = SubAgent(
+        name="reviewer", description="Reviews code", prompt="Review", tools=["nope"]
+    )
+    with pytest.raises(ValueError, match="unknown tools \\['nope'\\]"):
+        _create_subagent_tools(
+            [], "Instructions", [reviewer], EchoModel(), DeepAgentState
+        )
+
+
+@pytest.mark.unit
+def test_task_streams_subagent_output():
+    """Test the async task tool forwards subagent output to the custom stream."""
+    task_tool, _ = _create_subagent_tools(
+        [], "Instructions", [], EchoModel(), DeepAgentState
+    )
+    builder = StateGraph(DeepAgentState)
+    builder.add_node("tools", ToolNode([task_tool]))
+    builder.add_edge(START, "tools")
+    graph = builder.compile()
+    call = {
+        "name": "task",
+        "args": {"description": "do it", "subagent_type": "general-purpose"},
+        "id": "call_1",
+        "type": "tool_call",
+    }
+
+    async def collect():
+        return [
+            chunk
+            async for chunk in graph.astream(
+                {"messages": [AIMessage(content="", tool_calls=[call])]},
+                stream_mode="custom",
+            )
+        ]
+
+    assert asyncio.run(collect()) == [
+        {
+            "subagent_type": "general-purpose",
+            "tool_call_id": "call_1",
+            "content": "echo: do it",
+        }
+    ]
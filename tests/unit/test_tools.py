@@ -0,0 +1,40 @@
+"""Unit tests for the tools module."""
+
+import pytest
+from deepagents.state import file_reducer
+from deepagents.tools import edit_file, write_file
+
+
+def _call(tool_, files, **args):
+    """Invoke a file tool the way the agent's ToolNode would."""
+    state = {"messages": [], "is_last_step": False, "remaining_steps": 10, "files": files}
+    return tool_.invoke(
+        {
+            "type": "tool_call",
+            "id": "call_1",
+            "name": tool_.name,
+            "args": {**args, "state": state},
+        }
+    )
+
+
+@pytest.mark.unit
+def test_file_tools_return_only_the_changed_file():
+    """Test write_file and edit_file send a one-file update, not the whole map."""
+    files = file_reducer({}, {"/a.txt": "alpha", "/b.txt": "beta"})
+
+    command = _call(write_file, files, file_path="/c.txt", content="gamma")
+    assert command.update["files"] == {"/c.txt": "gamma"}
+    files = file_reducer(files, command.update["files"])
+
+    command = _call(
+        edit_file, files, file_path="/a.txt", old_string="alpha", new_string="ALPHA"
+    )
+    assert command.update["files"] == {"/a.txt": "ALPHA"}
+    files = file_reducer(files, command.update["files"])
+
+    assert {path: f["content"] for path, f in files.items()} == {
+        "/a.txt": "ALPHA",
+        "/b.txt": "beta",
+        "/c.txt": "gamma",
+    }